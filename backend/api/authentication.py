@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_CACHE_KEY = 'auth_token:{key}'
+
+# Кэш процесса: ключ токена -> (время истечения, пользователь, токен).
+_local_tokens = {}
+
+
+def invalidate_tokens(keys: list) -> None:
+    """Удаляет токены из кэша процесса и общего кэша."""
+    for key in keys:
+        _local_tokens.pop(key, None)
+    cache.delete_many([TOKEN_CACHE_KEY.format(key=key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с кэшированием пользователя по токену.
+
+    Снимок (пользователь, токен) хранится в памяти процесса с коротким
+    TTL и в общем кэше. Записи сбрасываются сигналами при удалении токена
+    и сохранении пользователя, поэтому запрос к authtoken_token нужен
+    только при промахе. Если общего кэша нет (LocMemCache), сброс не
+    дошел бы до других воркеров, и отозванный токен принимается не
+    дольше TOKEN_LOCAL_CACHE_TIMEOUT.
+    """
+
+    def authenticate_credentials(self, key: str) -> tuple:
+        now = time.monotonic()
+        entry = _local_tokens.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1:]
+        if settings.CACHE_IS_SHARED:
+            cache_key = TOKEN_CACHE_KEY.format(key=key)
+            credentials = cache.get(cache_key)
+            if credentials is None:
+                credentials = super().authenticate_credentials(key)
+                cache.set(
+                    cache_key,
+                    credentials,
+                    timeout=settings.TOKEN_CACHE_TIMEOUT,
+                )
+        else:
+            credentials = super().authenticate_credentials(key)
+        if len(_local_tokens) >= settings.TOKEN_LOCAL_CACHE_SIZE:
+            _local_tokens.clear()
+        _local_tokens[key] = (
+            now + settings.TOKEN_LOCAL_CACHE_TIMEOUT,
+            *credentials,
+        )
+        return credentials
@@ -0,0 +1,78 @@
+import time
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import User
+
+AUTHOR_CARD_KEY = 'author_card:{user_id}'
+CARD_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+# Кэш процесса: id пользователя -> (время истечения, карточка).
+_local_cards = {}
+
+
+def invalidate_author_card(user_id: int) -> None:
+    """Удаляет карточку из кэша процесса и общего кэша."""
+    _local_cards.pop(user_id, None)
+    cache.delete(AUTHOR_CARD_KEY.format(user_id=user_id))
+
+
+def get_author_cards(user_ids: Iterable) -> dict:
+    """Карточки пользователей по id: кортежи значений CARD_FIELDS.
+
+    Сначала проверяется кэш процесса с коротким TTL, затем одним
+    get_many общий кэш, и только оставшиеся карточки читаются из базы
+    одним запросом. Несуществующие пользователи в результат не попадают.
+    Сигналы сбрасывают карточку в общем кэше и в своем процессе, в
+    остальных процессах она живет до истечения короткого TTL. С
+    LocMemCache общего кэша нет: он был бы у каждого воркера свой и
+    держал бы старую карточку AUTHOR_CARD_CACHE_TIMEOUT, поэтому
+    промахи кэша процесса сразу читаются из базы.
+    """
+    now = time.monotonic()
+    cards = {}
+    missing = []
+    for user_id in set(user_ids):
+        entry = _local_cards.get(user_id)
+        if entry is not None and entry[0] > now:
+            cards[user_id] = entry[1]
+        else:
+            missing.append(user_id)
+    if not missing:
+        return cards
+    loaded = {}
+    if settings.CACHE_IS_SHARED:
+        keys = {
+            AUTHOR_CARD_KEY.format(user_id=user_id): user_id
+            for user_id in missing
+        }
+        loaded = {
+            keys[key]: card for key, card in cache.get_many(keys).items()
+        }
+    stale = [user_id for user_id in missing if user_id not in loaded]
+    if stale:
+        fetched = {
+            row[0]: row[1:]
+            for row in User.objects.filter(id__in=stale).values_list(
+                'id',
+                *CARD_FIELDS,
+            )
+        }
+        if settings.CACHE_IS_SHARED:
+            cache.set_many(
+                {
+                    AUTHOR_CARD_KEY.format(user_id=user_id): card
+                    for user_id, card in fetched.items()
+                },
+                timeout=settings.AUTHOR_CARD_CACHE_TIMEOUT,
+            )
+        loaded.update(fetched)
+    if len(_local_cards) + len(loaded) > settings.AUTHOR_CARD_LOCAL_CACHE_SIZE:
+        _local_cards.clear()
+    expires = now + settings.AUTHOR_CARD_LOCAL_CACHE_TIMEOUT
+    for user_id, card in loaded.items():
+        _local_cards[user_id] = (expires, card)
+    cards.update(loaded)
+    return cards
@@ -0,0 +1,87 @@
+from django.db import connection, models, transaction
+from django.db.models.sql import InsertQuery
+
+CREATED = 'created'
+EXISTS = 'exists'
+DELETED = 'deleted'
+MISSING = 'missing'
+NOT_FOUND = 'not_found'
+FORBIDDEN = 'forbidden'
+
+
+def bulk_mutate(
+    method: str,
+    model: type,
+    owner_field: str,
+    owner: models.Model,
+    target_field: str,
+    target_model: type,
+    ids: list,
+    forbidden_ids: tuple = (),
+) -> list:
+    """Массовое добавление/удаление связей владелец -> объект.
+
+    Объекты проверяются одним запросом IN, запись делается одним
+    INSERT с игнорированием конфликтов или одним DELETE ... WHERE IN.
+    Возвращает статус для каждого переданного id.
+    """
+    ids = list(dict.fromkeys(ids))
+    target_lookup = f'{target_field}_id'
+    owner_filter = {owner_field: owner}
+    with transaction.atomic():
+        found = set(
+            target_model.objects.filter(id__in=ids).values_list(
+                'id',
+                flat=True,
+            ),
+        )
+        existing = set(
+            model.objects.filter(
+                **owner_filter,
+                **{f'{target_lookup}__in': found},
+            ).values_list(target_lookup, flat=True),
+        )
+        if method == 'POST':
+            model.objects.bulk_create(
+                [
+                    model(**owner_filter, **{target_lookup: pk})
+                    for pk in found - existing - set(forbidden_ids)
+                ],
+                ignore_conflicts=True,
+            )
+        else:
+            model.objects.filter(
+                **owner_filter,
+                **{f'{target_lookup}__in': existing},
+            ).delete()
+    results = []
+    for pk in ids:
+        if pk not in found:
+            result = NOT_FOUND
+        elif pk in forbidden_ids:
+            result = FORBIDDEN
+        elif method == 'POST':
+            result = EXISTS if pk in existing else CREATED
+        else:
+            result = DELETED if pk in existing else MISSING
+        results.append({'id': pk, 'status': result})
+    return results
+
+
+def insert_ignore(model: type, **values: dict) -> bool:
+    """Вставка одной строки с INSERT ... ON CONFLICT DO NOTHING.
+
+    Дубликаты отсекаются уникальными ограничениями модели, поэтому
+    проверка и запись выполняются одним запросом без гонок.
+    Возвращает True, если строка была добавлена.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    query = InsertQuery(model, ignore_conflicts=True)
+    query.insert_values(fields, [model(**values)])
+    [(sql, params)] = query.get_compiler(connection=connection).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount == 1
@@ -0,0 +1,87 @@
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Имя маршрута -> теги кэша ответа для заголовка X-Cache-Tags.
+CACHE_TAGS = {
+    'recipe-list': 'recipes',
+    'recipe-detail': 'recipes recipe-{pk}',
+    'tags-list': 'tags',
+    'tags-detail': 'tags',
+    'ingredients-list': 'ingredients',
+    'ingredients-detail': 'ingredients',
+}
+
+
+def send_purge(paths: list) -> None:
+    for path in paths:
+        try:
+            requests.get(
+                settings.CACHE_PURGE_URL + path,
+                headers={
+                    'Host': settings.CACHE_PURGE_HOST,
+                    'Accept': 'application/json',
+                    'X-Cache-Purge': settings.CACHE_PURGE_SECRET,
+                },
+                timeout=settings.CACHE_PURGE_TIMEOUT,
+            )
+        except requests.RequestException:
+            logger.warning('Не удалось обновить кэш nginx для %s', path)
+
+
+class PurgeBatch:
+    """Пути для обновления, накопленные за одну транзакцию."""
+
+    def __init__(self, paths: tuple) -> None:
+        """Начинает пачку с путей первого вызова purge_cache."""
+        self.paths = set(paths)
+
+    def __call__(self) -> None:
+        threading.Thread(
+            target=send_purge,
+            args=(sorted(self.paths),),
+            daemon=True,
+        ).start()
+
+
+def purge_cache(*paths: str) -> None:
+    """Обновляет записи микрокэша nginx после коммита транзакции.
+
+    nginx перезапрашивает ответ для запроса, в заголовке X-Cache-Purge
+    которого передан CACHE_PURGE_SECRET, остальные варианты истекают по
+    короткому TTL. Пути из одной транзакции отправляются одной пачкой.
+    """
+    if not settings.CACHE_PURGE_URL or not settings.CACHE_PURGE_SECRET:
+        return
+    connection = transaction.get_connection()
+    for _, callback in connection.run_on_commit:
+        if isinstance(callback, PurgeBatch):
+            callback.paths.update(paths)
+            return
+    transaction.on_commit(PurgeBatch(paths))
+
+
+class CacheTagsMiddleware:
+    """Добавляет заголовок X-Cache-Tags к кэшируемым ответам API."""
+
+    def __init__(self, get_response: callable) -> None:
+        """Сохраняет следующий обработчик цепочки middleware."""
+        self.get_response = get_response
+
+    def __call__(self, request: object) -> object:
+        response = self.get_response(request)
+        match = request.resolver_match
+        if (
+            request.method in ('GET', 'HEAD')
+            and match is not None
+            and match.url_name in CACHE_TAGS
+        ):
+            response['X-Cache-Tags'] = CACHE_TAGS[match.url_name].format(
+                **match.kwargs,
+            )
+        return response
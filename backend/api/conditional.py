@@ -0,0 +1,71 @@
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from api.versions import (
+    CONTENT_VERSION_KEY,
+    RELATIONS_VERSION_KEY,
+    USERS_VERSION_KEY,
+    bump_version,
+    get_version,
+)
+
+
+def touch_relations(user_id: int) -> None:
+    """Отмечает изменение избранного, корзины или подписок пользователя."""
+    bump_version(RELATIONS_VERSION_KEY.format(user_id=user_id))
+
+
+def touch_users() -> None:
+    """Отмечает изменение профиля любого пользователя."""
+    bump_version(USERS_VERSION_KEY)
+
+
+def get_etag(request: Request, updated_at: Optional[datetime]) -> str:
+    """Слабый ETag для ответа с рецептами.
+
+    Строится из времени последнего изменения, версии содержимого
+    рецептов (меняется при удалении рецептов, правке тэгов и
+    ингредиентов и пересчете рейтингов) и версий связей пользователя.
+    Last-Modified не отдается: max(updated_at) не меняется при удалении
+    рецепта, а точность в секунду пропускает правки в пределах одной
+    секунды.
+    """
+    user_id = request.user.id
+    parts = [
+        updated_at,
+        get_version(CONTENT_VERSION_KEY),
+        get_version(USERS_VERSION_KEY),
+    ]
+    if user_id is not None:
+        parts.append(
+            get_version(RELATIONS_VERSION_KEY.format(user_id=user_id)),
+        )
+    digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified(request: Request, etag: str) -> Optional[HttpResponse]:
+    """Ответ 304, если ETag клиента совпал.
+
+    Версии хранятся в кэше, и без общего кэша у каждого воркера они
+    свои, поэтому с LocMemCache 304 не отдается.
+    """
+    if not settings.CACHE_IS_SHARED:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_etag(response, etag)
+    return response
+
+
+def set_etag(response: Response, etag: str) -> Response:
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -2,7 +2,16 @@ from django.db.models import QuerySet
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Tag, User
+from recipes.models import RecipePopularity, Tag, User
+
+# Сортировка -> поле RecipePopularity с индексом (-поле, -recipe).
+RECIPE_ORDERINGS = {
+    'popular': 'popular',
+    'trending': 'trending',
+}
+
+# Сравнение строк позволяет PostgreSQL начать обход индекса с позиции.
+AFTER_SQL = '("{table}"."{field}", "{table}"."recipe_id") < (%s, %s)'
 
 
 class RecipeFilter(filters.FilterSet):
@@ -17,6 +26,11 @@ class RecipeFilter(filters.FilterSet):
     )
     is_favorited = filters.BooleanFilter(method='favorited_filter')
     is_in_shopping_cart = filters.BooleanFilter(method='shoppingcart_filter')
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='ordering_filter',
+    )
+    after = filters.NumberFilter(method='after_filter')
 
     def shoppingcart_filter(
         self,
@@ -40,6 +54,51 @@ class RecipeFilter(filters.FilterSet):
             return queryset.filter(recipes__owner_id=user.id)
         return queryset
 
+    def ordering_filter(
+        self,
+        queryset: QuerySet,
+        name: str,
+        value: str,
+    ) -> QuerySet:
+        field = RECIPE_ORDERINGS[value]
+        return queryset.filter(popularity__isnull=False).order_by(
+            f'-popularity__{field}',
+            '-popularity__recipe_id',
+        )
+
+    def after_filter(
+        self,
+        queryset: QuerySet,
+        name: str,
+        value: int,
+    ) -> QuerySet:
+        """Keyset-пагинация: рецепты после рецепта с id=after.
+
+        Вместо OFFSET запрос начинает обход индекса сортировки сразу с
+        позиции этого рецепта, поэтому глубокие страницы стоят столько же,
+        сколько первая.
+        """
+        ordering = self.form.cleaned_data.get('ordering')
+        if not ordering:
+            return queryset.filter(id__lt=value)
+        field = RECIPE_ORDERINGS[ordering]
+        score = (
+            RecipePopularity.objects.filter(recipe_id=value)
+            .values_list(field, flat=True)
+            .first()
+        )
+        if score is None:
+            return queryset.none()
+        return queryset.extra(
+            where=[
+                AFTER_SQL.format(
+                    table=RecipePopularity._meta.db_table,
+                    field=field,
+                ),
+            ],
+            params=[score, value],
+        )
+
 
 class IngredientSearchFilter(SearchFilter):
     search_param = 'name'
@@ -0,0 +1,116 @@
+import io
+import pstats
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.profiling import make_profile_token
+
+
+def read_folded(path: Path) -> Counter:
+    stacks = Counter()
+    for line in path.read_text().splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack:
+            stacks[stack] += int(count)
+    return stacks
+
+
+class Command(BaseCommand):
+    help = (
+        'Сводка по профилям запросов: самые затратные функции '
+        'по каждому маршруту.'
+    )
+
+    def add_arguments(self, parser: object) -> None:
+        parser.add_argument(
+            '--route',
+            default='',
+            help='Только маршруты, содержащие эту строку, например recipes.',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Сколько функций показывать по каждому маршруту.',
+        )
+        parser.add_argument(
+            '--merge',
+            action='store_true',
+            help=(
+                'Сохранить объединенные стеки маршрута в <маршрут>.folded '
+                'для просмотра в speedscope или flamegraph.pl.'
+            ),
+        )
+        parser.add_argument(
+            '--token',
+            action='store_true',
+            help='Напечатать значение заголовка X-Profile и выйти.',
+        )
+
+    def handle(self, *args: tuple, **options: dict) -> None:
+        if options['token']:
+            self.stdout.write(make_profile_token())
+            return
+        root = Path(settings.PROFILING_DIR)
+        if not root.is_dir():
+            self.stdout.write(f'Профилей пока нет: {root}')
+            return
+        for directory in sorted(root.iterdir()):
+            if directory.is_dir() and options['route'] in directory.name:
+                self.report_samples(directory, options)
+                self.report_cprofile(directory, options['top'])
+
+    def report_samples(self, directory: Path, options: dict) -> None:
+        files = sorted(directory.glob('*.folded'))
+        if not files:
+            return
+        stacks = Counter()
+        for path in files:
+            stacks.update(read_folded(path))
+        total = sum(stacks.values())
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        interval_ms = settings.PROFILING_INTERVAL * 1000
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f'{directory.name}: запросов {len(files)}, '
+                f'сэмплов {total} (~{total * interval_ms:.0f} мс)',
+            ),
+        )
+        self.stdout.write('  собственное время:')
+        for frame, count in own.most_common(options['top']):
+            self.stdout.write(f'  {count / total:7.1%}  {frame}')
+        self.stdout.write('  с учетом вложенных вызовов:')
+        for frame, count in inclusive.most_common(options['top']):
+            self.stdout.write(f'  {count / total:7.1%}  {frame}')
+        if options['merge']:
+            merged = directory.with_suffix('.folded')
+            merged.write_text(
+                ''.join(
+                    f'{stack} {count}\n' for stack, count in stacks.items()
+                ),
+            )
+            self.stdout.write(f'  стеки сохранены в {merged}')
+
+    def report_cprofile(self, directory: Path, top: int) -> None:
+        files = sorted(str(path) for path in directory.glob('*.prof'))
+        if not files:
+            return
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f'{directory.name}: cProfile, запросов {len(files)}',
+            ),
+        )
+        # OutputWrapper дописывает перевод строки к каждому write.
+        output = io.StringIO()
+        stats = pstats.Stats(*files, stream=output)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(top)
+        self.stdout.write(output.getvalue())
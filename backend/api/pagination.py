@@ -1,5 +1,55 @@
+from typing import Optional
+
+from django.conf import settings
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from foodgram_backend.pagination import EstimatedCountPaginator
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class EstimatedCountPagination(PageLimitPagination):
+    """Пагинация с приблизительным count для больших таблиц."""
+
+    django_paginator_class = EstimatedCountPaginator
+
+
+class RecipePagination(EstimatedCountPagination):
+    """Пагинация рецептов с keyset-переходом по параметру after.
+
+    Если запрос пришел с after, ссылка next тоже ведет по after от
+    последнего рецепта страницы, а не по номеру страницы.
+    """
+
+    def get_next_link(self) -> Optional[str]:
+        if 'after' not in self.request.query_params:
+            return super().get_next_link()
+        if not self.page.has_next():
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(),
+            self.page_query_param,
+        )
+        return replace_query_param(
+            url,
+            'after',
+            self.page.object_list[-1]['id'],
+        )
+
+
+def get_recipes_limit(request: Request) -> int:
+    """Параметр recipes_limit, ограниченный RECIPES_LIMIT_MAX.
+
+    Без параметра или с некорректным значением отдается не больше
+    RECIPES_LIMIT_MAX рецептов, полное число есть в recipes_count.
+    """
+    try:
+        recipes_limit = int(request.query_params['recipes_limit'])
+    except (KeyError, ValueError):
+        return settings.RECIPES_LIMIT_MAX
+    return min(max(recipes_limit, 0), settings.RECIPES_LIMIT_MAX)
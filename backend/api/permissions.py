@@ -14,4 +14,7 @@ class IsOwner(BasePermission):
         view: Callable,
         obj: models.Model,
     ) -> bool:
-        return request.method in SAFE_METHODS or obj.author == request.user
+        return (
+            request.method in SAFE_METHODS
+            or obj.author_id == request.user.id
+        )
@@ -0,0 +1,145 @@
+import cProfile
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.http import HttpRequest, HttpResponse
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_SALT = 'api.profiling'
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+
+
+def make_profile_token() -> str:
+    """Подписанное значение заголовка X-Profile для принудительной записи."""
+    return signing.dumps('profile', salt=PROFILE_SALT)
+
+
+def frame_label(code: object) -> str:
+    filename = Path(code.co_filename)
+    try:
+        filename = filename.relative_to(settings.BASE_DIR)
+    except ValueError:
+        filename = Path(*filename.parts[-2:])
+    return f'{filename}:{code.co_name}:{code.co_firstlineno}'
+
+
+class StackSampler:
+    """Сэмплирующий профилировщик одного потока.
+
+    Фоновый поток раз в PROFILING_INTERVAL секунд снимает стек
+    профилируемого потока и считает одинаковые стеки, что дает
+    формат collapsed stacks (он же импортируется в speedscope).
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        """Готовит сэмплер потока thread_id с периодом interval секунд."""
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                self.stacks[';'.join(reversed(labels))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: Path) -> None:
+        path.write_text(
+            ''.join(
+                f'{stack} {count}\n' for stack, count in self.stacks.items()
+            ),
+        )
+
+
+def remove_old_profiles(directory: Path) -> None:
+    """Оставляет в каталоге маршрута PROFILING_MAX_FILES новых профилей.
+
+    Имена файлов - время записи в наносекундах, поэтому сортировка по
+    имени упорядочивает их по времени. Каталогов столько же, сколько
+    маршрутов, так что общий объем тоже ограничен.
+    """
+    files = sorted(directory.iterdir())
+    for path in files[: max(len(files) - settings.PROFILING_MAX_FILES, 0)]:
+        path.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """Профилирует часть запросов и сохраняет результат по маршрутам.
+
+    Профилируется доля PROFILING_SAMPLE_RATE запросов и все запросы
+    с подписанным заголовком X-Profile. Результаты пишутся в
+    PROFILING_DIR/<маршрут>/ и агрегируются командой profile_report,
+    в каждом каталоге хранятся только последние PROFILING_MAX_FILES.
+    """
+
+    def __init__(self, get_response: callable) -> None:
+        """Сохраняет следующий обработчик цепочки middleware."""
+        self.get_response = get_response
+
+    def should_profile(self, request: HttpRequest) -> bool:
+        token = request.META.get(PROFILE_HEADER)
+        if token:
+            try:
+                signing.loads(
+                    token,
+                    salt=PROFILE_SALT,
+                    max_age=PROFILE_TOKEN_MAX_AGE,
+                )
+                return True
+            except signing.BadSignature:
+                return False
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not self.should_profile(request):
+            return self.get_response(request)
+        if settings.PROFILING_MODE == 'cprofile':
+            profiler = cProfile.Profile()
+            response = profiler.runcall(self.get_response, request)
+            path = self.output_path(request, 'prof')
+            profiler.dump_stats(path)
+            remove_old_profiles(path.parent)
+            return response
+        sampler = StackSampler(
+            threading.get_ident(),
+            settings.PROFILING_INTERVAL,
+        )
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop()
+        path = self.output_path(request, 'folded')
+        sampler.dump(path)
+        remove_old_profiles(path.parent)
+        return response
+
+    def output_path(self, request: HttpRequest, extension: str) -> Path:
+        """PROFILING_DIR/<метод>-<имя маршрута>/<время>.<расширение>."""
+        match = request.resolver_match
+        route = match.url_name if match and match.url_name else 'unknown'
+        directory = (
+            Path(settings.PROFILING_DIR) / f'{request.method.lower()}-{route}'
+        )
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / f'{time.time_ns()}.{extension}'
@@ -0,0 +1,176 @@
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.db.models import Count, QuerySet
+from rest_framework.request import Request
+
+from api.author_cards import CARD_FIELDS, get_author_cards
+from api.pagination import get_recipes_limit
+from recipes.models import (
+    Favourite,
+    Follow,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    ShoppingCart,
+)
+
+RECIPE_FIELDS = ('id', 'author_id', 'name', 'image', 'text', 'cooking_time')
+SHORT_RECIPE_FIELDS = ('id', 'author_id', 'image', 'name', 'cooking_time')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+
+IMAGE_STORAGE = Recipe._meta.get_field('image').storage
+
+
+def image_url(name: str, request: Optional[Request] = None) -> str:
+    if not name:
+        return None
+    url = IMAGE_STORAGE.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def subscribed_authors(request: Request, author_ids: Iterable) -> set:
+    user = request.user
+    if not user.is_authenticated:
+        return set()
+    return set(
+        Follow.objects.filter(
+            follower=user,
+            author_id__in=author_ids,
+        ).values_list('author_id', flat=True),
+    )
+
+
+def represent_users(request: Request, user_ids: Iterable) -> dict:
+    """Карточки пользователей по id в формате CustomUserSerializer."""
+    cards = get_author_cards(user_ids)
+    subscribed = subscribed_authors(request, cards)
+    return {
+        user_id: {
+            **dict(zip(CARD_FIELDS, card)),
+            'is_subscribed': user_id in subscribed,
+        }
+        for user_id, card in cards.items()
+    }
+
+
+def owned_recipes(request: Request, model: type, recipe_ids: list) -> set:
+    user = request.user
+    if not user.is_authenticated:
+        return set()
+    return set(
+        model.objects.filter(
+            owner=user,
+            recipes_id__in=recipe_ids,
+        ).values_list('recipes_id', flat=True),
+    )
+
+
+def represent_recipes(request: Request, rows: list) -> list:
+    """Список рецептов в формате CreateRecipeSerializer."""
+    recipe_ids = [row['id'] for row in rows]
+    tags = defaultdict(list)
+    for line in (
+        RecipeTag.objects.filter(recipe_id__in=recipe_ids)
+        .order_by('tag_id')
+        .values('recipe_id', 'tag__id', 'tag__name', 'tag__color', 'tag__slug')
+    ):
+        tags[line['recipe_id']].append(
+            {
+                'id': line['tag__id'],
+                'name': line['tag__name'],
+                'color': line['tag__color'],
+                'slug': line['tag__slug'],
+            },
+        )
+    ingredients = defaultdict(list)
+    for line in RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids,
+    ).values(
+        'id',
+        'recipe_id',
+        'ingredients__name',
+        'ingredients__measurement_unit',
+        'amount',
+    ):
+        ingredients[line['recipe_id']].append(
+            {
+                'id': line['id'],
+                'name': line['ingredients__name'],
+                'measurement_unit': line['ingredients__measurement_unit'],
+                'amount': line['amount'],
+            },
+        )
+    authors = represent_users(request, (row['author_id'] for row in rows))
+    favorited = owned_recipes(request, Favourite, recipe_ids)
+    in_shopping_cart = owned_recipes(request, ShoppingCart, recipe_ids)
+    return [
+        {
+            'id': row['id'],
+            'tags': tags[row['id']],
+            'author': authors[row['author_id']],
+            'ingredients': ingredients[row['id']],
+            'is_favorited': row['id'] in favorited,
+            'is_in_shopping_cart': row['id'] in in_shopping_cart,
+            'name': row['name'],
+            'image': image_url(row['image'], request),
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+        for row in rows
+    ]
+
+
+def latest_recipes(author_ids: list, limit: int) -> dict:
+    """Последние limit рецептов каждого автора одним запросом.
+
+    Для каждого автора берется срез по индексу (author, -id), срезы
+    объединяются через UNION ALL, поэтому рецепты сверх лимита не
+    читаются.
+    """
+    recipes = defaultdict(list)
+    if not author_ids or not limit:
+        return recipes
+    first, *rest = (
+        Recipe.objects.filter(author_id=author_id)
+        .order_by('-id')
+        .values(*SHORT_RECIPE_FIELDS)[:limit]
+        for author_id in author_ids
+    )
+    for row in first.union(*rest, all=True):
+        recipes[row.pop('author_id')].append(
+            {**row, 'image': image_url(row['image'])},
+        )
+    return recipes
+
+
+def represent_subscriptions(request: Request, author_ids: list) -> list:
+    """Список подписок в формате SubscriptionSerializer.
+
+    recipes_count считается агрегатом в базе, а из рецептов читаются
+    только первые recipes_limit каждого автора.
+    """
+    authors = represent_users(request, author_ids)
+    counts = dict(
+        Recipe.objects.filter(author_id__in=author_ids)
+        .values('author_id')
+        .annotate(count=Count('id'))
+        .values_list('author_id', 'count')
+        .order_by(),
+    )
+    recipes = latest_recipes(author_ids, get_recipes_limit(request))
+    return [
+        {
+            **authors[author_id],
+            'recipes': recipes[author_id],
+            'recipes_count': counts.get(author_id, 0),
+        }
+        for author_id in author_ids
+    ]
+
+
+def represent_ingredients(queryset: QuerySet) -> list:
+    """Список ингредиентов в формате IngredientSerializer."""
+    return list(queryset.values(*INGREDIENT_FIELDS))
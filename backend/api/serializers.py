@@ -4,21 +4,40 @@ from collections import OrderedDict
 import webcolors
 from django.conf import settings
 from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, QuerySet
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 
+from api.pagination import get_recipes_limit
+from api.representations import represent_users, subscribed_authors
+from jobs.queue import enqueue
 from recipes.models import (
     Favourite,
     Follow,
     Ingredient,
     Recipe,
     RecipeIngredient,
-    ShoppingCart,
+    RecipeTag,
     Tag,
     User,
 )
+from recipes.similarity import update_similar
+
+
+def get_recipe_detail_queryset() -> QuerySet:
+    """Рецепты со всеми данными для CreateRecipeSerializer за 3 запроса.
+
+    Автор берется из кэша карточек, см. CreateRecipeSerializer.get_author.
+    """
+    return Recipe.objects.prefetch_related(
+        'tags',
+        Prefetch(
+            'ingredients_line',
+            queryset=RecipeIngredient.objects.select_related('ingredients'),
+        ),
+    )
 
 
 class CustomUserSerializer(UserSerializer):
@@ -39,11 +58,9 @@ class CustomUserSerializer(UserSerializer):
 
     def get_is_subscribed(self, obj: User) -> bool:
         request = self.context['request']
-        author = User.objects.filter(username=obj).first()
-        follower = request.user
-        if follower.is_authenticated:
-            return follower.follower.filter(author=author).exists()
-        return False
+        if obj.pk == request.user.pk:
+            return False
+        return obj.pk in subscribed_authors(request, [obj.pk])
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -120,7 +137,7 @@ class Base64ImageField(serializers.ImageField):
 class RecipeIngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для связанной модели рецепт-ингредиент."""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField(min_value=1)
     name = serializers.ReadOnlyField(source='ingredients.name')
     measurement_unit = serializers.StringRelatedField(
         source='ingredients.measurement_unit',
@@ -142,7 +159,7 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         source='ingredients_line',
         many=True,
     )
-    author = CustomUserSerializer(read_only=True)
+    author = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     cooking_time = serializers.IntegerField(
@@ -166,6 +183,11 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('author',)
 
+    def get_author(self, obj: Recipe) -> dict:
+        """Карточка автора в формате CustomUserSerializer."""
+        authors = represent_users(self.context['request'], [obj.author_id])
+        return authors[obj.author_id]
+
     def get_is_favorited(self, obj: Recipe) -> bool:
         owner = self.context['request'].user
         if owner.is_authenticated:
@@ -184,45 +206,70 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Убедитесь, что добавлен хотя бы один тег',
             )
+        try:
+            tags = serializers.ListField(
+                child=serializers.IntegerField(min_value=1),
+            ).run_validation(tags)
+        except serializers.ValidationError as error:
+            raise serializers.ValidationError({'tags': error.detail})
         if len(tags) != len(set(tags)):
             raise serializers.ValidationError('Теги должны быть уникальными')
+        if Tag.objects.filter(id__in=tags).count() != len(tags):
+            raise serializers.ValidationError('Указан несуществующий тег')
         data['tags'] = tags
+        if 'ingredients_line' in data:
+            self.validate_ingredients_line(data['ingredients_line'])
         return data
 
-    def ingredients_factory(
+    def validate_ingredients_line(self, ingredients_line: list) -> None:
+        if not ingredients_line:
+            raise serializers.ValidationError(
+                'Убедитесь, что добавлен хотя бы один ингредиент',
+            )
+        ids = [ingredient['id'] for ingredient in ingredients_line]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                'Ингредиенты должны быть уникальными',
+            )
+        missing = set(ids) - set(
+            Ingredient.objects.filter(id__in=ids).values_list('id', flat=True),
+        )
+        if missing:
+            raise serializers.ValidationError(
+                f'Указаны несуществующие ингредиенты: {sorted(missing)}',
+            )
+
+    def set_lines(
         self,
         recipe: Recipe,
+        tags: list,
         ingredient_data: list,
     ) -> None:
-        """Функция для создания объектов промежуточной модели."""
-        ingredient_lst = []
-        for ingredient in ingredient_data:
-            ingredient_lst.append(
+        """Создание объектов промежуточных моделей тегов и ингредиентов."""
+        RecipeTag.objects.bulk_create(
+            [RecipeTag(recipe=recipe, tag_id=tag_id) for tag_id in tags],
+        )
+        RecipeIngredient.objects.bulk_create(
+            [
                 RecipeIngredient(
                     recipe=recipe,
-                    ingredients_id=ingredient['id'].pk,
+                    ingredients_id=ingredient['id'],
                     amount=ingredient['amount'],
-                ),
-            )
-        RecipeIngredient.objects.bulk_create(ingredient_lst)
+                )
+                for ingredient in ingredient_data
+            ],
+        )
+        enqueue(update_similar, [recipe.pk])
 
+    @transaction.atomic
     def create(self, validated_data: dict) -> Recipe:
-        image = validated_data.pop('image')
-        tags_data = validated_data.pop('tags')
+        tags = validated_data.pop('tags')
         ingredients_line = validated_data.pop('ingredients_line')
-        recipe = Recipe.objects.create(image=image, **validated_data)
-        Favourite.objects.create(
-            owner=validated_data['author'],
-            recipes=recipe,
-        )
-        ShoppingCart.objects.create(
-            owner=validated_data['author'],
-            recipes=recipe,
-        )
-        recipe.tags.set(tags_data)
-        self.ingredients_factory(recipe, ingredients_line)
-        return recipe
+        recipe = Recipe.objects.create(**validated_data)
+        self.set_lines(recipe, tags, ingredients_line)
+        return get_recipe_detail_queryset().get(pk=recipe.pk)
 
+    @transaction.atomic
     def update(self, instance: Recipe, validated_data: dict) -> Recipe:
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
@@ -233,12 +280,11 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         )
         ingredients_data = validated_data.pop('ingredients_line')
         tags = validated_data.pop('tags')
-        instance.tags.clear()
-        instance.tags.add(*tags)
-        instance.ingredients.clear()
-        self.ingredients_factory(instance, ingredients_data)
+        RecipeTag.objects.filter(recipe=instance).delete()
+        RecipeIngredient.objects.filter(recipe=instance).delete()
+        self.set_lines(instance, tags, ingredients_data)
         instance.save()
-        return instance
+        return get_recipe_detail_queryset().get(pk=instance.pk)
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
@@ -247,6 +293,65 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'image', 'name', 'cooking_time')
 
 
+class MatchRequestSerializer(serializers.Serializer):
+    """Сериализатор списка продуктов для подбора рецептов."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.MATCH_MAX_INGREDIENTS,
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.MATCH_MAX_LIMIT,
+        default=settings.MATCH_DEFAULT_LIMIT,
+    )
+
+
+class MatchedRecipeSerializer(ShortRecipeSerializer):
+    """Сериализатор рецепта с оценкой покрытия продуктами."""
+
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(ShortRecipeSerializer.Meta):
+        fields = ShortRecipeSerializer.Meta.fields + (
+            'matched',
+            'missing',
+            'coverage',
+        )
+
+
+class SimilarRecipeSerializer(ShortRecipeSerializer):
+    """Сериализатор похожего рецепта с оценкой близости."""
+
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(ShortRecipeSerializer.Meta):
+        fields = ShortRecipeSerializer.Meta.fields + ('score',)
+
+
+class ShoppingListQuerySerializer(serializers.Serializer):
+    """Параметры запроса списка покупок."""
+
+    servings = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.SHOPPING_LIST_MAX_SERVINGS,
+        default=1,
+    )
+
+
+class BulkIdsSerializer(serializers.Serializer):
+    """Список id для массовых операций."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_IDS,
+    )
+
+
 class SubscriptionSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
     follower = serializers.HiddenField(
@@ -259,16 +364,6 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         model = Follow
         fields = ('author', 'follower', 'recipes', 'recipes_count')
 
-    def validate(self, data: dict) -> dict:
-        if (
-            get_object_or_404(User, id=self.context['view'].kwargs['user_id'])
-            == data['follower']
-        ):
-            raise serializers.ValidationError(
-                'Нельзя подписаться на самого себя!',
-            )
-        return data
-
     def get_recipes_count(self, obj: Recipe) -> int:
         return Recipe.objects.filter(author=obj.author).count()
 
@@ -283,13 +378,10 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         representation = super().to_representation(instance)
         author_data = representation.pop('author')
         recipes_data = representation.pop('recipes')
-        recipes_limit = self.context['request'].GET.get('recipes_limit')
+        recipes_limit = get_recipes_limit(self.context['request'])
         new_representation = OrderedDict()
         new_representation.update(author_data)
-        if recipes_limit:
-            new_representation['recipes'] = recipes_data[: int(recipes_limit)]
-        else:
-            new_representation['recipes'] = recipes_data
+        new_representation['recipes'] = recipes_data[:recipes_limit]
         new_representation.update(representation)
         return new_representation
 
@@ -297,25 +389,6 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 class FavouriteSerializer(serializers.ModelSerializer):
     recipes = ShortRecipeSerializer(required=False, read_only=True)
 
-    def validate(self, data: dict) -> dict:
-        request = self.context['request']
-        recipe = get_object_or_404(
-            Recipe,
-            id=self.context['view'].kwargs['recipe_id'],
-        )
-        owner = request.user
-        if request.method == 'POST':
-            if owner.owner.filter(recipes=recipe).exists():
-                raise serializers.ValidationError(
-                    {'error': 'Рецепт уже в избранном!'},
-                )
-        if request.method == 'DELETE':
-            if not owner.owner.filter(recipes=recipe).exists():
-                raise serializers.ValidationError(
-                    {'error': 'Рецепта нет в избранном!'},
-                )
-        return data
-
     class Meta:
         model = Favourite
         fields = ('recipes', 'owner')
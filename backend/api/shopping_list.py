@@ -0,0 +1,157 @@
+from collections import defaultdict
+from operator import itemgetter
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+
+from api.versions import (
+    CART_VERSION_KEY,
+    CONTENT_VERSION_KEY,
+    bump_version,
+    get_version,
+)
+from recipes.models import RecipeIngredient
+
+# Единица измерения -> (базовая единица, множитель к базовой).
+UNIT_CONVERSIONS = {
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'ч. л.': ('ч. л.', 1),
+    'ст. л.': ('ч. л.', 3),
+}
+
+# Базовая единица -> единицы для вывода с множителями, от крупной к мелкой.
+DISPLAY_UNITS = {
+    base_unit: sorted(
+        (
+            (unit, factor)
+            for unit, (base, factor) in UNIT_CONVERSIONS.items()
+            if base == base_unit
+        ),
+        key=itemgetter(1),
+        reverse=True,
+    )
+    for base_unit, _ in UNIT_CONVERSIONS.values()
+}
+
+SHOPPING_LIST_KEY = 'shopping_list:{user_id}:{cart}:{content}:{servings}'
+
+
+def touch_shopping_cart(user_id: int) -> None:
+    """Сбрасывает кэш списка покупок пользователя после изменения корзины."""
+    bump_version(CART_VERSION_KEY.format(user_id=user_id))
+
+
+def normalize_unit(unit: str, amount: int) -> tuple:
+    """Приводит количество к базовой единице, если она известна."""
+    base_unit, factor = UNIT_CONVERSIONS.get(unit, (unit, 1))
+    return base_unit, amount * factor
+
+
+def display_unit(unit: str, amounts: list) -> tuple:
+    """Самая крупная единица, в которой все количества целые.
+
+    5000 г выводятся как 5 кг, а 1500 г остаются граммами, чтобы
+    в списке не появлялись дроби.
+    """
+    for display, factor in DISPLAY_UNITS.get(unit, ()):
+        if all(amount % factor == 0 for amount in amounts):
+            return display, factor
+    return unit, 1
+
+
+def aggregate_shopping_list(user_id: int, servings: int = 1) -> list:
+    """Собирает список покупок с разбивкой по рецептам.
+
+    Суммирование по ингредиентам и рецептам делается одним SQL-запросом,
+    приведение единиц и слияние совместимых строк - проходом в Python.
+    Количества складываются в базовых единицах, а выводятся в единице
+    из display_unit.
+    """
+    lines = (
+        RecipeIngredient.objects.filter(
+            recipe__shopping_cart_recipes__owner_id=user_id,
+        )
+        .values(
+            'ingredients__name',
+            'ingredients__measurement_unit',
+            'recipe_id',
+            'recipe__name',
+        )
+        .annotate(amount=Sum('amount'))
+        .order_by()
+    )
+    totals = defaultdict(int)
+    breakdown = defaultdict(lambda: defaultdict(int))
+    recipe_names = {}
+    for line in lines:
+        unit, amount = normalize_unit(
+            line['ingredients__measurement_unit'],
+            line['amount'] * servings,
+        )
+        key = (line['ingredients__name'], unit)
+        totals[key] += amount
+        breakdown[key][line['recipe_id']] += amount
+        recipe_names[line['recipe_id']] = line['recipe__name']
+    shopping_list = []
+    for name, base_unit in sorted(totals):
+        amounts = breakdown[(name, base_unit)]
+        unit, factor = display_unit(
+            base_unit,
+            [totals[(name, base_unit)], *amounts.values()],
+        )
+        shopping_list.append(
+            {
+                'name': name,
+                'measurement_unit': unit,
+                'amount': totals[(name, base_unit)] // factor,
+                'recipes': [
+                    {
+                        'id': recipe_id,
+                        'name': recipe_names[recipe_id],
+                        'amount': amount // factor,
+                    }
+                    for recipe_id, amount in sorted(amounts.items())
+                ],
+            },
+        )
+    return shopping_list
+
+
+def get_shopping_list(user_id: Optional[int], servings: int = 1) -> list:
+    """Возвращает список покупок из кэша, привязанного к версии корзины.
+
+    Версии корзины хранятся в кэше. В LocMemCache у каждого воркера они
+    свои, и изменение корзины не сбросило бы кэш других воркеров, поэтому
+    без общего кэша список считается заново на каждый запрос.
+    """
+    if user_id is None:
+        return []
+    if not settings.CACHE_IS_SHARED:
+        return aggregate_shopping_list(user_id, servings)
+    key = SHOPPING_LIST_KEY.format(
+        user_id=user_id,
+        cart=get_version(CART_VERSION_KEY.format(user_id=user_id)),
+        content=get_version(CONTENT_VERSION_KEY),
+        servings=servings,
+    )
+    shopping_list = cache.get(key)
+    if shopping_list is None:
+        shopping_list = aggregate_shopping_list(user_id, servings)
+        cache.set(
+            key,
+            shopping_list,
+            timeout=settings.SHOPPING_LIST_CACHE_TIMEOUT,
+        )
+    return shopping_list
+
+
+def render_shopping_list(shopping_list: list) -> str:
+    return '\n'.join(
+        f'{item["name"]} ({item["measurement_unit"]}) — {item["amount"]}'
+        for item in shopping_list
+    )
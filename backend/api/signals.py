@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import invalidate_tokens
+from api.author_cards import invalidate_author_card
+from api.cache_purge import purge_cache
+from api.conditional import touch_users
+from api.versions import touch_content
+from recipes.deletion import recipes_deleted
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipePopularity,
+    Tag,
+    User,
+    popularity_refreshed,
+)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(recipes_deleted, sender=Recipe)
+def recipe_changed(sender: type, **kwargs: dict) -> None:
+    touch_content()
+    instance = kwargs.get('instance')
+    if instance is not None:
+        purge_cache('/api/recipes/', f'/api/recipes/{instance.pk}/')
+    else:
+        purge_cache('/api/recipes/')
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(
+    sender: type,
+    instance: Recipe,
+    created: bool,
+    raw: bool,
+    **kwargs: dict,
+) -> None:
+    # Сортировка по рейтингу берет только рецепты со строкой рейтинга.
+    # refreshed_at в прошлом: инкрементальный пересчет начинается с
+    # max(refreshed_at), и новая строка не должна сдвигать его вперед.
+    if created and not raw:
+        RecipePopularity.objects.create(
+            recipe=instance,
+            refreshed_at=settings.POPULARITY_EPOCH,
+        )
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender: type, **kwargs: dict) -> None:
+    # Тэги встроены в ответы с рецептами.
+    touch_content()
+    purge_cache('/api/tags/', '/api/recipes/')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender: type, **kwargs: dict) -> None:
+    # Название и единица ингредиента есть в рецептах и списках покупок.
+    touch_content()
+    purge_cache('/api/ingredients/', '/api/recipes/')
+
+
+@receiver(popularity_refreshed)
+def popularity_changed(sender: type, **kwargs: dict) -> None:
+    # Пересчет меняет порядок ?ordering=popular и trending.
+    touch_content()
+    purge_cache('/api/recipes/')
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender: type, instance: Token, **kwargs: dict) -> None:
+    transaction.on_commit(lambda key=instance.key: invalidate_tokens([key]))
+
+
+@receiver(post_save, sender=User)
+def user_changed(
+    sender: type,
+    instance: User,
+    update_fields: frozenset = None,
+    **kwargs: dict,
+) -> None:
+    if update_fields == frozenset(['last_login']):
+        return
+    touch_users()
+    # После коммита: иначе параллельный запрос успеет закэшировать
+    # старую строку до фиксации изменений.
+    transaction.on_commit(
+        lambda user_id=instance.pk: invalidate_author_card(user_id),
+    )
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True),
+    )
+    transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender: type, instance: User, **kwargs: dict) -> None:
+    transaction.on_commit(
+        lambda user_id=instance.pk: invalidate_author_card(user_id),
+    )
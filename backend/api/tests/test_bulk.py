@@ -0,0 +1,154 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import Favourite, Follow, Recipe, ShoppingCart, User
+
+MISSING_ID = 10 ** 9
+
+
+class BulkEndpointsTest(TestCase):
+    """Статусы массовых операций для каждого переданного id."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user, cls.first, cls.second = (
+            User.objects.create_user(
+                username=name,
+                email=f'{name}@foodgram.ru',
+                password='password',
+            )
+            for name in ('user', 'first', 'second')
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.first,
+                name=f'Рецепт {number}',
+                image='recipes/images/recipe.png',
+                text='Описание',
+                cooking_time=5,
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def statuses(self, method: str, url: str, ids: list) -> list:
+        response = getattr(self.client, method)(
+            url,
+            {'ids': ids},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (result['id'], result['status'])
+            for result in response.json()['results']
+        ]
+
+    def assert_recipe_bulk(self, url: str, model: type) -> None:
+        first, second, third = (recipe.id for recipe in self.recipes)
+        model.objects.create(owner=self.user, recipes_id=first)
+        self.assertEqual(
+            self.statuses('post', url, [first, second, MISSING_ID, second]),
+            [
+                (first, 'exists'),
+                (second, 'created'),
+                (MISSING_ID, 'not_found'),
+            ],
+        )
+        self.assertEqual(
+            set(
+                model.objects.filter(owner=self.user).values_list(
+                    'recipes_id',
+                    flat=True,
+                ),
+            ),
+            {first, second},
+        )
+        self.assertEqual(
+            self.statuses('delete', url, [first, third, MISSING_ID]),
+            [
+                (first, 'deleted'),
+                (third, 'missing'),
+                (MISSING_ID, 'not_found'),
+            ],
+        )
+        self.assertEqual(
+            list(
+                model.objects.filter(owner=self.user).values_list(
+                    'recipes_id',
+                    flat=True,
+                ),
+            ),
+            [second],
+        )
+
+    def test_shopping_cart(self) -> None:
+        self.assert_recipe_bulk(
+            '/api/recipes/shopping_cart/bulk/',
+            ShoppingCart,
+        )
+
+    def test_favorite(self) -> None:
+        self.assert_recipe_bulk('/api/recipes/favorite/bulk/', Favourite)
+
+    def test_subscriptions(self) -> None:
+        url = '/api/users/subscriptions/bulk/'
+        Follow.objects.create(follower=self.user, author=self.first)
+        self.assertEqual(
+            self.statuses(
+                'post',
+                url,
+                [self.first.id, self.second.id, self.user.id, MISSING_ID],
+            ),
+            [
+                (self.first.id, 'exists'),
+                (self.second.id, 'created'),
+                (self.user.id, 'forbidden'),
+                (MISSING_ID, 'not_found'),
+            ],
+        )
+        self.assertFalse(
+            Follow.objects.filter(follower=self.user, author=self.user),
+        )
+        self.assertEqual(
+            self.statuses(
+                'delete',
+                url,
+                [self.first.id, self.first.id, self.user.id],
+            ),
+            [(self.first.id, 'deleted'), (self.user.id, 'forbidden')],
+        )
+        self.assertEqual(
+            self.statuses('delete', url, [self.first.id]),
+            [(self.first.id, 'missing')],
+        )
+        self.assertEqual(
+            list(
+                Follow.objects.filter(follower=self.user).values_list(
+                    'author_id',
+                    flat=True,
+                ),
+            ),
+            [self.second.id],
+        )
+
+    def test_invalid_requests(self) -> None:
+        url = '/api/recipes/favorite/bulk/'
+        self.assertEqual(
+            self.client.post(url, {'ids': []}, format='json').status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.client.post(
+                url,
+                {'ids': [self.recipes[0].id]},
+                format='json',
+            ).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
@@ -0,0 +1,104 @@
+import threading
+
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import Favourite, Follow, Recipe, ShoppingCart, User
+
+THREADS = 8
+
+
+class ConcurrentWritesTest(TransactionTestCase):
+    """Одновременные POST одного пользователя создают ровно одну строку.
+
+    Запросы идут из отдельных потоков со своими соединениями с базой и
+    стартуют одновременно через Barrier, поэтому дубликаты отсекает
+    только уникальное ограничение в базе.
+    """
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(
+            username='user',
+            email='user@foodgram.ru',
+            password='password',
+        )
+        self.author = User.objects.create_user(
+            username='author',
+            email='author@foodgram.ru',
+            password='password',
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name='Рецепт',
+            image='recipes/images/recipe.png',
+            text='Описание',
+            cooking_time=5,
+        )
+
+    def post_concurrently(self, url: str) -> list:
+        barrier = threading.Barrier(THREADS)
+        codes = []
+
+        def post() -> None:
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                codes.append(client.post(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(codes)
+
+    def assert_single_write(self, codes: list) -> None:
+        self.assertEqual(
+            codes,
+            [status.HTTP_201_CREATED]
+            + [status.HTTP_400_BAD_REQUEST] * (THREADS - 1),
+        )
+
+    def test_favorite(self) -> None:
+        codes = self.post_concurrently(
+            f'/api/recipes/{self.recipe.id}/favorite/',
+        )
+        self.assert_single_write(codes)
+        self.assertEqual(
+            Favourite.objects.filter(
+                owner=self.user,
+                recipes=self.recipe,
+            ).count(),
+            1,
+        )
+
+    def test_shopping_cart(self) -> None:
+        codes = self.post_concurrently(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/',
+        )
+        self.assert_single_write(codes)
+        self.assertEqual(
+            ShoppingCart.objects.filter(
+                owner=self.user,
+                recipes=self.recipe,
+            ).count(),
+            1,
+        )
+
+    def test_subscribe(self) -> None:
+        codes = self.post_concurrently(
+            f'/api/users/{self.author.id}/subscribe/',
+        )
+        self.assert_single_write(codes)
+        self.assertEqual(
+            Follow.objects.filter(
+                follower=self.user,
+                author=self.author,
+            ).count(),
+            1,
+        )
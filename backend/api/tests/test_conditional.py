@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favourite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+    User,
+)
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class ConditionalGetTest(TestCase):
+    """ETag меняется вместе с данными, встроенными в ответ."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(
+            username='user',
+            email='user@foodgram.ru',
+            password='password',
+        )
+        cls.tag = Tag.objects.create(name='Завтрак', color='#fff', slug='b')
+        cls.ingredient = Ingredient.objects.create(
+            name='Мука',
+            measurement_unit='г',
+        )
+        cls.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.user,
+                name=f'Рецепт {number}',
+                image='recipes/images/recipe.png',
+                text='Описание',
+                cooking_time=5,
+            )
+            RecipeTag.objects.create(recipe=recipe, tag=cls.tag)
+            RecipeIngredient.objects.create(
+                recipe=recipe,
+                ingredients=cls.ingredient,
+                amount=100,
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+
+    def assert_changed(self, url: str, change: callable) -> dict:
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def rename_tag(self) -> None:
+        self.tag.name = 'Ужин'
+        self.tag.save()
+
+    def test_tag_rename(self) -> None:
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipes[0].id}/'):
+            with self.subTest(url=url):
+                data = self.assert_changed(url, self.rename_tag)
+                recipe = data['results'][0] if 'results' in data else data
+                self.assertEqual(recipe['tags'][0]['name'], 'Ужин')
+                self.tag.name = 'Завтрак'
+                self.tag.save()
+
+    def test_ingredient_change(self) -> None:
+        def change_unit() -> None:
+            self.ingredient.measurement_unit = 'кг'
+            self.ingredient.save()
+
+        data = self.assert_changed(
+            f'/api/recipes/{self.recipes[0].id}/',
+            change_unit,
+        )
+        self.assertEqual(data['ingredients'][0]['measurement_unit'], 'кг')
+
+    def test_popularity_refresh(self) -> None:
+        call_command('refresh_popularity', '--full', stdout=StringIO())
+        Favourite.objects.create(owner=self.user, recipes=self.recipes[0])
+
+        def refresh() -> None:
+            call_command('refresh_popularity', '--full', stdout=StringIO())
+
+        data = self.assert_changed('/api/recipes/?ordering=popular', refresh)
+        self.assertEqual(data['results'][0]['id'], self.recipes[0].id)
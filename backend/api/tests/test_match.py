@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, User
+
+URL = '/api/recipes/match/'
+# Состав рецептов: индексы ингредиентов.
+COMPOSITIONS = (
+    (0, 1),
+    (0, 1, 2, 3),
+    (0, 3),
+    (0, 3, 4, 5),
+    (6, 7),
+    (0, 1, 2),
+    (0, 1, 2, 3, 4, 5),
+)
+PANTRY = (0, 1, 2)
+
+
+class MatchTest(TestCase):
+    """Ранжирование рецептов по покрытию продуктами."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(
+            username='user',
+            email='user@foodgram.ru',
+            password='password',
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(8)
+        )
+        cls.recipes = []
+        for number, composition in enumerate(COMPOSITIONS):
+            recipe = Recipe.objects.create(
+                author=cls.user,
+                name=f'Рецепт {number}',
+                image='recipes/images/recipe.png',
+                text='Описание',
+                cooking_time=5,
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredients=cls.ingredients[index],
+                    amount=1,
+                )
+                for index in composition
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+
+    def match(self, **data: dict) -> list:
+        data.setdefault(
+            'ingredients',
+            [self.ingredients[index].id for index in PANTRY],
+        )
+        response = self.client.post(URL, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [
+            (
+                recipe['id'],
+                recipe['matched'],
+                recipe['missing'],
+                recipe['coverage'],
+            )
+            for recipe in response.json()
+        ]
+
+    def test_ranking(self) -> None:
+        pair, four, half, quarter, _, full, six = (
+            recipe.id for recipe in self.recipes
+        )
+        # По доле покрытия, при равной - по числу недостающих, затем новые.
+        self.assertEqual(
+            self.match(),
+            [
+                (full, 3, 0, 1.0),
+                (pair, 2, 0, 1.0),
+                (four, 3, 1, 0.75),
+                (half, 1, 1, 0.5),
+                (six, 3, 3, 0.5),
+                (quarter, 1, 3, 0.25),
+            ],
+        )
+
+    def test_limit(self) -> None:
+        self.assertEqual(
+            [recipe[0] for recipe in self.match(limit=2)],
+            [self.recipes[5].id, self.recipes[0].id],
+        )
+
+    def test_no_candidates(self) -> None:
+        self.assertEqual(self.match(ingredients=[10 ** 9]), [])
+
+    def test_invalid_request(self) -> None:
+        for data in ({'ingredients': []}, {'ingredients': [1], 'limit': 0}):
+            with self.subTest(data=data):
+                self.assertEqual(
+                    self.client.post(URL, data, format='json').status_code,
+                    status.HTTP_400_BAD_REQUEST,
+                )
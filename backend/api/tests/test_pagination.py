@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.core.paginator import EmptyPage
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.pagination import EstimatedCountPagination
+from foodgram_backend.pagination import EstimatedCountPaginator
+from recipes.models import User
+
+ROWS = 20
+PAGE_SIZE = 5
+
+
+@override_settings(EXACT_COUNT_THRESHOLD=5)
+class EstimatedCountPaginatorTest(TestCase):
+    """Оценка count не влияет на доступные страницы и ссылку next."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        User.objects.bulk_create(
+            User(username=f'user{number}', email=f'user{number}@foodgram.ru')
+            for number in range(ROWS)
+        )
+
+    def paginate(self, estimate: int) -> EstimatedCountPaginator:
+        paginator = EstimatedCountPaginator(
+            User.objects.order_by('id'),
+            PAGE_SIZE,
+        )
+        with mock.patch(
+            'foodgram_backend.pagination.estimate_count',
+            return_value=estimate,
+        ):
+            self.assertEqual(paginator.count, estimate)
+        return paginator
+
+    def test_low_estimate(self) -> None:
+        paginator = self.paginate(estimate=10)
+        self.assertTrue(paginator.page(2).has_next())
+        last = paginator.page(4)
+        self.assertEqual(len(last), PAGE_SIZE)
+        self.assertFalse(last.has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(5)
+
+    def test_high_estimate(self) -> None:
+        paginator = self.paginate(estimate=90)
+        self.assertFalse(paginator.page(4).has_next())
+        with self.assertRaises(EmptyPage):
+            paginator.page(5)
+
+    def test_next_link(self) -> None:
+        pagination = EstimatedCountPagination()
+        request = Request(
+            APIRequestFactory().get('/api/users/', {'page': 3, 'limit': 5}),
+        )
+        with mock.patch(
+            'foodgram_backend.pagination.estimate_count',
+            return_value=10,
+        ):
+            page = pagination.paginate_queryset(
+                User.objects.order_by('id'),
+                request,
+            )
+            response = pagination.get_paginated_response(page)
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual(len(response.data['results']), PAGE_SIZE)
+        self.assertIn('page=4', response.data['next'])
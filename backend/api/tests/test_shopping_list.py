@@ -0,0 +1,109 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    User,
+)
+
+URL = '/api/recipes/shopping_list/'
+
+
+class ShoppingListTest(TestCase):
+    """Итоги списка покупок в единицах, приведенных к общей."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(
+            username='user',
+            email='user@foodgram.ru',
+            password='password',
+        )
+        units = {
+            (name, unit): Ingredient.objects.create(
+                name=name,
+                measurement_unit=unit,
+            )
+            for name, unit in (
+                ('Мука', 'кг'),
+                ('Мука', 'г'),
+                ('Сахар', 'кг'),
+                ('Сахар', 'г'),
+                ('Соль', 'ст. л.'),
+                ('Соль', 'ч. л.'),
+            )
+        }
+        cls.flour = units[('Мука', 'г')]
+        compositions = (
+            {('Мука', 'кг'): 1, ('Сахар', 'кг'): 1, ('Соль', 'ст. л.'): 1},
+            {('Мука', 'г'): 1500, ('Сахар', 'г'): 250, ('Соль', 'ч. л.'): 3},
+        )
+        cls.recipes = []
+        for number, composition in enumerate(compositions):
+            recipe = Recipe.objects.create(
+                author=cls.user,
+                name=f'Рецепт {number}',
+                image='recipes/images/recipe.png',
+                text='Описание',
+                cooking_time=5,
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredients=units[key],
+                    amount=amount,
+                )
+                for key, amount in composition.items()
+            )
+            ShoppingCart.objects.create(owner=cls.user, recipes=recipe)
+            cls.recipes.append(recipe)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def totals(self, **params: dict) -> dict:
+        return {
+            item['name']: (
+                item['amount'],
+                item['measurement_unit'],
+                [recipe['amount'] for recipe in item['recipes']],
+            )
+            for item in self.client.get(URL, params).json()
+        }
+
+    def test_converted_totals(self) -> None:
+        self.assertEqual(
+            self.totals(servings=2),
+            {
+                'Мука': (5, 'кг', [2, 3]),
+                'Сахар': (2500, 'г', [2000, 500]),
+                'Соль': (4, 'ст. л.', [2, 2]),
+            },
+        )
+
+    def test_download(self) -> None:
+        content = self.client.get(
+            '/api/recipes/download_shopping_cart/',
+        ).content.decode()
+        self.assertEqual(
+            content.splitlines(),
+            [
+                'Мука (г) — 2500',
+                'Сахар (г) — 1250',
+                'Соль (ст. л.) — 2',
+            ],
+        )
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_ingredient_rename_resets_cache(self) -> None:
+        self.assertIn('Мука', self.totals())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.flour.name = 'Мука высшего сорта'
+            self.flour.save()
+        self.assertIn('Мука высшего сорта', self.totals())
@@ -0,0 +1,170 @@
+import random
+import time
+from functools import wraps
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    ScopedRateThrottle,
+    UserRateThrottle,
+)
+
+BUCKET_KEY = 'throttle_bucket:{key}:{window}'
+CONCURRENCY_KEY = 'concurrency:{scope}:{slot}'
+
+# Отказы процесса: ключ троттлинга -> момент, когда появится место.
+_denied = {}
+
+
+class WindowBucketMixin:
+    """Скользящее окно из двух счетчиков вместо журнала SimpleRateThrottle.
+
+    Время делится на окна длиной в период ставки ('60/min' - минута),
+    на каждое окно в общем кэше заводится счетчик запросов. Число
+    запросов за последний период оценивается как счетчик текущего окна
+    плюс доля предыдущего, еще попадающая в период. Счетчики меняются
+    только атомарными add и incr, поэтому одновременные запросы разных
+    воркеров не теряют обновлений, а ключи окон истекают сами. Отказ
+    запоминается в памяти процесса до появления места, так что
+    повторные запросы отбиваются без обращения к кэшу.
+    """
+
+    wait_time = None
+
+    def allow_request(self, request: Request, view: Callable) -> bool:
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        denied_until = _denied.get(self.key)
+        if denied_until is not None:
+            self.wait_time = denied_until - time.monotonic()
+            if self.wait_time > 0:
+                return False
+            _denied.pop(self.key, None)
+        self.wait_time = self.consume()
+        if self.wait_time is None:
+            return True
+        if len(_denied) >= settings.THROTTLE_LOCAL_CACHE_SIZE:
+            _denied.clear()
+        _denied[self.key] = time.monotonic() + self.wait_time
+        return False
+
+    def consume(self) -> Optional[float]:
+        """Учитывает запрос; при отказе возвращает время до появления места."""
+        window, elapsed = divmod(time.time(), self.duration)
+        current_key = BUCKET_KEY.format(key=self.key, window=int(window))
+        previous = cache.get(
+            BUCKET_KEY.format(key=self.key, window=int(window) - 1),
+            0,
+        )
+        cache.add(current_key, 0, timeout=2 * self.duration)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            return None
+        if previous * (1 - elapsed / self.duration) + current <= (
+            self.num_requests
+        ):
+            return None
+        try:
+            current = cache.decr(current_key)
+        except ValueError:
+            current -= 1
+        if current >= self.num_requests:
+            return self.duration - elapsed
+        # Место появится, когда доля предыдущего окна уменьшится.
+        free = (self.num_requests - current - 1) / previous
+        return self.duration * (1 - free) - elapsed
+
+    def wait(self) -> Optional[float]:
+        return self.wait_time
+
+
+class AnonBucketThrottle(WindowBucketMixin, AnonRateThrottle):
+    """Ставка 'anon' для анонимов по IP."""
+
+
+class UserBucketThrottle(WindowBucketMixin, UserRateThrottle):
+    """Ставка 'user' для пользователей по id, для анонимов по IP."""
+
+
+class ScopedBucketThrottle(WindowBucketMixin, ScopedRateThrottle):
+    """Ставка по throttle_scope вьюхи или экшена."""
+
+    def allow_request(self, request: Request, view: Callable) -> bool:
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Сервер перегружен, повторите запрос позже.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait: int) -> None:
+        """Ошибка с рекомендованной паузой wait в секундах."""
+        super().__init__()
+        # Обработчик исключений DRF выставит по нему Retry-After.
+        self.wait = wait
+
+
+def acquire_slot(scope: str, limit: int) -> Optional[str]:
+    """Занимает свободный слот области, возвращает его ключ или None.
+
+    Каждый слот - отдельный ключ со своим TTL: слот, потерянный при
+    падении воркера, освобождается сам и не сбивает учет остальных.
+    Перебор начинается со случайного слота, чтобы одновременные запросы
+    не сталкивались на первых ключах.
+    """
+    offset = random.randrange(max(limit, 1))
+    for index in range(limit):
+        key = CONCURRENCY_KEY.format(
+            scope=scope,
+            slot=(offset + index) % limit,
+        )
+        if cache.add(key, 1, timeout=settings.CONCURRENCY_SLOT_TIMEOUT):
+            return key
+    return None
+
+
+def limit_concurrency(scope: str) -> callable:
+    """Ограничивает число одновременных запросов к методу вьюхи.
+
+    Занятые слоты хранятся в общем кэше, лимиты задаются в
+    CONCURRENCY_LIMITS. Если свободных слотов нет, сразу отвечает 503 с
+    Retry-After, не занимая воркер.
+    """
+
+    def decorator(method: callable) -> callable:
+        @wraps(method)
+        def wrapper(
+            view: Callable,
+            request: Request,
+            *args: tuple,
+            **kwargs: dict,
+        ) -> object:
+            limit = settings.CONCURRENCY_LIMITS.get(scope)
+            if limit is None:
+                return method(view, request, *args, **kwargs)
+            slot = acquire_slot(scope, limit)
+            if slot is None:
+                raise Overloaded(settings.CONCURRENCY_RETRY_AFTER)
+            try:
+                return method(view, request, *args, **kwargs)
+            finally:
+                cache.delete(slot)
+
+        return wrapper
+
+    return decorator
@@ -33,6 +33,11 @@ auth = [
 ]
 
 urlpatterns = [
+    path(
+        'users/subscriptions/bulk/',
+        FollowViewSet.as_view({'post': 'bulk', 'delete': 'bulk'}),
+        name='follow-bulk',
+    ),
     path('', include(router.urls)),
     path('', include(auth)),
 ]
@@ -0,0 +1,33 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Версия содержимого рецептов: сами рецепты, их тэги и ингредиенты,
+# порядок по рейтингу. Входит в ETag и ключи кэша списков покупок.
+CONTENT_VERSION_KEY = 'content_version'
+USERS_VERSION_KEY = 'users_version'
+RELATIONS_VERSION_KEY = 'relations_version:{user_id}'
+CART_VERSION_KEY = 'shopping_cart_version:{user_id}'
+
+
+def get_version(key: str) -> int:
+    """Текущая версия данных; при отсутствии в кэше - метка времени."""
+    cache.add(key, time.time_ns(), timeout=None)
+    return cache.get(key)
+
+
+def bump_version(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def touch_content() -> None:
+    """Отмечает изменение содержимого рецептов после коммита.
+
+    До коммита параллельный запрос увидел бы новую версию со старыми
+    данными и сохранил бы их в кэше под новой версией.
+    """
+    transaction.on_commit(lambda: bump_version(CONTENT_VERSION_KEY))
@@ -1,42 +1,150 @@
-from django.db.models import QuerySet, Sum
+from django.db.models import (
+    Count,
+    ExpressionWrapper,
+    F,
+    FloatField,
+    Max,
+    Q,
+    QuerySet,
+)
 from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.generics import CreateAPIView, DestroyAPIView, ListAPIView
+from rest_framework.generics import (
+    CreateAPIView,
+    DestroyAPIView,
+    ListAPIView,
+    get_object_or_404,
+)
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
 from rest_framework.viewsets import GenericViewSet
 
+from api.bulk import bulk_mutate, insert_ignore
+from api.conditional import (
+    get_etag,
+    not_modified,
+    set_etag,
+    touch_relations,
+)
 from api.filters import IngredientSearchFilter, RecipeFilter
-from api.pagination import PageLimitPagination
+from api.pagination import EstimatedCountPagination, RecipePagination
 from api.permissions import IsOwner
+from api.representations import (
+    RECIPE_FIELDS,
+    represent_ingredients,
+    represent_recipes,
+    represent_subscriptions,
+    represent_users,
+)
 from api.serializers import (
+    BulkIdsSerializer,
     CreateRecipeSerializer,
     FavouriteSerializer,
     IngredientSerializer,
+    MatchedRecipeSerializer,
+    MatchRequestSerializer,
+    ShoppingListQuerySerializer,
     ShortRecipeSerializer,
+    SimilarRecipeSerializer,
     SubscriptionSerializer,
     TagSerializer,
+    get_recipe_detail_queryset,
 )
+from api.shopping_list import (
+    get_shopping_list,
+    render_shopping_list,
+    touch_shopping_cart,
+)
+from api.throttling import limit_concurrency
+from recipes.deletion import delete_recipes, delete_user
 from recipes.models import (
     Favourite,
     Follow,
     Ingredient,
     Recipe,
+    RecipeIngredient,
     ShoppingCart,
     Tag,
     User,
 )
 
 
+def bulk_response(request: Request, **kwargs: dict) -> Response:
+    serializer = BulkIdsSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    results = bulk_mutate(
+        request.method,
+        owner=request.user,
+        ids=serializer.validated_data['ids'],
+        **kwargs,
+    )
+    touch_relations(request.user.id)
+    return Response({'results': results})
+
+
+def recipe_relation_response(
+    request: Request,
+    model: type,
+    recipe_id: int,
+    exists_error: str,
+    missing_error: str,
+) -> Response:
+    """Добавление/удаление рецепта в избранном или корзине.
+
+    Запись - один INSERT ... ON CONFLICT DO NOTHING, удаление - один
+    DELETE; результат определяется по числу затронутых строк.
+    """
+    owner = request.user
+    if request.method == 'POST':
+        recipe = get_object_or_404(Recipe, pk=recipe_id)
+        if not insert_ignore(model, owner_id=owner.id, recipes_id=recipe.id):
+            return Response(
+                {'error': exists_error},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        touch_relations(owner.id)
+        serializer = ShortRecipeSerializer(
+            recipe,
+            context={'request': request},
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    deleted, _ = model.objects.filter(
+        owner=owner,
+        recipes_id=recipe_id,
+    ).delete()
+    if not deleted:
+        get_object_or_404(Recipe, pk=recipe_id)
+        return Response(
+            {'error': missing_error},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    touch_relations(owner.id)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class UserViewSet(DjoserUserViewSet):
     """Обновленный DjoserViewSet с кастомной пагинацией."""
 
-    pagination_class = PageLimitPagination
+    pagination_class = EstimatedCountPagination
+
+    def list(self, request: Request, *args: tuple, **kwargs: dict) -> Response:
+        """Список из кэша карточек, подписки - одним запросом на страницу."""
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset())
+            .order_by('id')
+            .values_list('id', flat=True),
+        )
+        users = represent_users(request, page)
+        return self.get_paginated_response(
+            [users[user_id] for user_id in page if user_id in users],
+        )
+
+    def perform_destroy(self, instance: User) -> None:
+        delete_user(instance)
 
 
 class TagsViewSet(viewsets.ReadOnlyModelViewSet):
@@ -56,6 +164,10 @@ class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (IngredientSearchFilter,)
     search_fields = ('^name', 'name')
 
+    def list(self, request: Request, *args: tuple, **kwargs: dict) -> Response:
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(represent_ingredients(queryset))
+
 
 class RecipesViewSet(viewsets.ModelViewSet):
     """Вьюсет для отображения/создания/обновления/удаления рецептов."""
@@ -64,24 +176,93 @@ class RecipesViewSet(viewsets.ModelViewSet):
     serializer_class = CreateRecipeSerializer
     filterset_class = RecipeFilter
     filter_backends = (DjangoFilterBackend,)
-    pagination_class = PageLimitPagination
+    pagination_class = RecipePagination
     permission_classes = (permissions.IsAuthenticatedOrReadOnly & IsOwner,)
+    throttle_scope = None
+
+    def get_queryset(self) -> QuerySet:
+        if self.action == 'retrieve':
+            return get_recipe_detail_queryset()
+        return super().get_queryset()
+
+    def get_throttles(self) -> list:
+        if self.action in ('create', 'update', 'partial_update'):
+            self.throttle_scope = 'uploads'
+        return super().get_throttles()
+
+    @limit_concurrency('uploads')
+    def create(
+        self,
+        request: Request,
+        *args: tuple,
+        **kwargs: dict,
+    ) -> Response:
+        return super().create(request, *args, **kwargs)
+
+    @limit_concurrency('uploads')
+    def update(
+        self,
+        request: Request,
+        *args: tuple,
+        **kwargs: dict,
+    ) -> Response:
+        return super().update(request, *args, **kwargs)
 
     def perform_create(self, serializer: Serializer) -> None:
         serializer.save(author=self.request.user)
 
-    @action(methods=['get'], detail=False, url_path='download_shopping_cart')
+    def perform_destroy(self, instance: Recipe) -> None:
+        delete_recipes(Recipe.objects.filter(pk=instance.pk))
+
+    def list(self, request: Request, *args: tuple, **kwargs: dict) -> Response:
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = get_etag(
+            request,
+            queryset.aggregate(updated_at=Max('updated_at'))['updated_at'],
+        )
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        page = self.paginate_queryset(queryset.values(*RECIPE_FIELDS))
+        return set_etag(
+            self.get_paginated_response(represent_recipes(request, page)),
+            etag,
+        )
+
+    def retrieve(
+        self,
+        request: Request,
+        *args: tuple,
+        **kwargs: dict,
+    ) -> Response:
+        updated_at = get_object_or_404(
+            Recipe.objects.values_list('updated_at', flat=True),
+            pk=kwargs['pk'],
+        )
+        etag = get_etag(request, updated_at)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+        return set_etag(super().retrieve(request, *args, **kwargs), etag)
+
+    def get_shopping_list(self, request: Request) -> list:
+        query = ShoppingListQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return get_shopping_list(
+            request.user.id,
+            query.validated_data['servings'],
+        )
+
+    @action(
+        methods=['get'],
+        detail=False,
+        url_path='download_shopping_cart',
+        throttle_scope='shopping_list',
+    )
+    @limit_concurrency('shopping_list')
     def download_shopping_cart(self, request: Request) -> Response:
-        user = request.user
         filename = 'shopping_list.txt'
-        items = Ingredient.objects.filter(
-            recipeingredient__recipe__shopping_cart_recipes__owner=user.id,
-        ).annotate(amount=Sum('recipeingredient__amount'))
-        simple_ingredient_list = [
-            f'{obj.name} ({obj.measurement_unit}) — {obj.amount}'
-            for obj in items
-        ]
-        content = '\n'.join(simple_ingredient_list)
+        content = render_shopping_list(self.get_shopping_list(request))
         response = HttpResponse(
             content,
             content_type='text.txt; charset=utf-8',
@@ -89,6 +270,86 @@ class RecipesViewSet(viewsets.ModelViewSet):
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
 
+    @action(
+        methods=['get'],
+        detail=False,
+        url_path='shopping_list',
+        permission_classes=[permissions.IsAuthenticated],
+        throttle_scope='shopping_list',
+    )
+    @limit_concurrency('shopping_list')
+    def shopping_list(self, request: Request) -> Response:
+        """Список покупок с приведением единиц и разбивкой по рецептам."""
+        return Response(self.get_shopping_list(request))
+
+    @action(
+        methods=['post'],
+        detail=False,
+        url_path='match',
+        permission_classes=[permissions.AllowAny],
+    )
+    def match(self, request: Request) -> Response:
+        """Подбор рецептов по списку имеющихся продуктов.
+
+        Кандидаты берутся из индекса ингредиент -> рецепт, покрытие
+        считается одним GROUP BY по строкам RecipeIngredient.
+        """
+        serializer = MatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pantry = set(serializer.validated_data['ingredients'])
+        limit = serializer.validated_data['limit']
+        candidates = RecipeIngredient.objects.filter(
+            ingredients_id__in=pantry,
+        ).values('recipe_id')
+        recipes = (
+            Recipe.objects.filter(id__in=candidates)
+            .annotate(
+                total=Count('ingredients_line'),
+                matched=Count(
+                    'ingredients_line',
+                    filter=Q(ingredients_line__ingredients_id__in=pantry),
+                ),
+            )
+            .annotate(
+                missing=F('total') - F('matched'),
+                coverage=ExpressionWrapper(
+                    F('matched') * 1.0 / F('total'),
+                    output_field=FloatField(),
+                ),
+            )
+            .order_by('-coverage', 'missing', '-id')[:limit]
+        )
+        serializer = MatchedRecipeSerializer(
+            recipes,
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
+
+    @action(
+        methods=['get'],
+        detail=True,
+        url_path='similar',
+        permission_classes=[permissions.AllowAny],
+    )
+    def similar(self, request: Request, **kwargs: dict) -> Response:
+        """Похожие рецепты из предрасчитанной таблицы соседей."""
+        recipe_id = get_object_or_404(
+            Recipe.objects.values_list('id', flat=True),
+            pk=kwargs['pk'],
+        )
+        recipes = (
+            Recipe.objects.filter(similar_to__recipe_id=recipe_id)
+            .annotate(score=F('similar_to__score'))
+            .order_by('-score', 'id')
+        )
+        serializer = SimilarRecipeSerializer(
+            recipes,
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data)
+
     @action(
         methods=[
             'post',
@@ -99,14 +360,49 @@ class RecipesViewSet(viewsets.ModelViewSet):
         permission_classes=[permissions.IsAuthenticated],
     )
     def shopping_cart(self, request: Request, **kwargs: dict) -> Response:
-        owner = request.user
-        recipe = get_object_or_404(Recipe, pk=kwargs.get('pk'))
-        if request.method == 'POST':
-            ShoppingCart.objects.create(owner=owner, recipes=recipe)
-            serializer = ShortRecipeSerializer(recipe)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        ShoppingCart.objects.filter(owner=owner, recipes=recipe).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        response = recipe_relation_response(
+            request,
+            ShoppingCart,
+            kwargs.get('pk'),
+            exists_error='Рецепт уже в списке покупок!',
+            missing_error='Рецепта нет в списке покупок!',
+        )
+        touch_shopping_cart(request.user.id)
+        return response
+
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='shopping_cart/bulk',
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def shopping_cart_bulk(self, request: Request) -> Response:
+        """Массовое добавление/удаление рецептов в корзине."""
+        response = bulk_response(
+            request,
+            model=ShoppingCart,
+            owner_field='owner',
+            target_field='recipes',
+            target_model=Recipe,
+        )
+        touch_shopping_cart(request.user.id)
+        return response
+
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='favorite/bulk',
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def favorite_bulk(self, request: Request) -> Response:
+        """Массовое добавление/удаление рецептов в избранном."""
+        return bulk_response(
+            request,
+            model=Favourite,
+            owner_field='owner',
+            target_field='recipes',
+            target_model=Recipe,
+        )
 
     @action(
         methods=['post', 'delete'],
@@ -115,14 +411,13 @@ class RecipesViewSet(viewsets.ModelViewSet):
         permission_classes=[permissions.IsAuthenticated],
     )
     def favourite(self, request: Request, **kwargs: dict) -> Response:
-        owner = request.user
-        recipe = get_object_or_404(Recipe, kwargs.get('pk'))
-        if request.method == 'POST':
-            Favourite.objects.create(owner=owner, recipes=recipe)
-            serializer = ShortRecipeSerializer(recipe)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        Favourite.objects.filter(owner=owner, recipes=recipe).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return recipe_relation_response(
+            request,
+            Favourite,
+            kwargs.get('pk'),
+            exists_error='Рецепт уже в избранном!',
+            missing_error='Рецепта нет в избранном!',
+        )
 
 
 class FollowViewSet(
@@ -135,12 +430,38 @@ class FollowViewSet(
 
     queryset = Follow.objects.all()
     serializer_class = SubscriptionSerializer
-    pagination_class = PageLimitPagination
+    pagination_class = EstimatedCountPagination
     permission_classes = (permissions.IsAuthenticated,)
+    throttle_scope = 'subscriptions'
 
     def get_queryset(self) -> QuerySet:
         return self.request.user.follower.all()
 
+    @limit_concurrency('subscriptions')
+    def list(self, request: Request, *args: tuple, **kwargs: dict) -> Response:
+        page = self.paginate_queryset(
+            self.get_queryset().values_list('author_id', flat=True),
+        )
+        return self.get_paginated_response(
+            represent_subscriptions(request, page),
+        )
+
+    def bulk(self, request: Request, **kwargs: dict) -> Response:
+        """Массовая подписка/отписка на авторов.
+
+        Не @action: вьюсет зарегистрирован еще и под
+        users/<user_id>/subscribe, где user_id игнорировался бы, поэтому
+        маршрут задан явно только под users/subscriptions в urls.py.
+        """
+        return bulk_response(
+            request,
+            model=Follow,
+            owner_field='follower',
+            target_field='author',
+            target_model=User,
+            forbidden_ids=(request.user.id,),
+        )
+
     def create(
         self,
         request: Request,
@@ -149,11 +470,13 @@ class FollowViewSet(
     ) -> Response:
         follower = request.user
         author = get_object_or_404(User, id=kwargs.get('user_id'))
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        follow_instance = follower.follower.filter(author=author)
-        if not follow_instance.exists():
-            Follow.objects.create(author=author, follower=follower)
+        if author == follower:
+            return Response(
+                {'error': 'Нельзя подписаться на самого себя!'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if insert_ignore(Follow, author_id=author.id, follower_id=follower.id):
+            touch_relations(follower.id)
             return Response(status=status.HTTP_201_CREATED)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
@@ -163,19 +486,17 @@ class FollowViewSet(
         *args: tuple,
         **kwargs: dict,
     ) -> Response:
-        follower = request.user
-        author = get_object_or_404(User, id=kwargs.get('user_id'))
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        follow_instance = follower.follower.filter(author=author)
-        if follow_instance.exists():
-            follow_instance.delete()
+        author_id = kwargs.get('user_id')
+        deleted, _ = request.user.follower.filter(author_id=author_id).delete()
+        if deleted:
+            touch_relations(request.user.id)
             return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(User, id=author_id)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
 
 class FavouriteView(CreateAPIView, DestroyAPIView, GenericViewSet):
-    """Вьюсет для создания/удаления подписок."""
+    """Вьюсет для добавления/удаления рецептов в избранном."""
 
     serializer_class = FavouriteSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
@@ -186,14 +507,13 @@ class FavouriteView(CreateAPIView, DestroyAPIView, GenericViewSet):
         *args: tuple,
         **kwargs: dict,
     ) -> Response:
-        owner = request.user
-        recipe = get_object_or_404(Recipe, id=kwargs.get('recipe_id'))
-        serializer = self.get_serializer(
-            data={'owner': owner, 'recipes': recipe},
+        return recipe_relation_response(
+            request,
+            Favourite,
+            kwargs.get('recipe_id'),
+            exists_error='Рецепт уже в избранном!',
+            missing_error='Рецепта нет в избранном!',
         )
-        serializer.is_valid(raise_exception=True)
-        owner.owner.filter(recipes=recipe).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
 
     def create(
         self,
@@ -201,16 +521,10 @@ class FavouriteView(CreateAPIView, DestroyAPIView, GenericViewSet):
         *args: tuple,
         **kwargs: dict,
     ) -> Response:
-        owner = request.user
-        recipe = get_object_or_404(Recipe, id=kwargs.get('recipe_id'))
-        serializer = self.get_serializer(
-            data={'owner': owner, 'recipes': recipe},
-        )
-        serializer.is_valid(raise_exception=True)
-        serializer.save(owner=owner, recipes=recipe)
-        headers = self.get_success_headers(serializer.data)
-        return Response(
-            serializer.data['recipes'],
-            status=status.HTTP_201_CREATED,
-            headers=headers,
+        return recipe_relation_response(
+            request,
+            Favourite,
+            kwargs.get('recipe_id'),
+            exists_error='Рецепт уже в избранном!',
+            missing_error='Рецепта нет в избранном!',
         )
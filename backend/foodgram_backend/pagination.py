@@ -0,0 +1,138 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import (
+    EmptyPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+COUNT_CACHE_KEY = 'count:{digest}'
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    """Оценка числа строк таблицы по статистике PostgreSQL.
+
+    Возвращает None, если оценка недоступна: запрос отфильтрован,
+    база не PostgreSQL или статистика еще не собрана.
+    """
+    query = queryset.query
+    connection = connections[queryset.db]
+    if query.where or query.distinct or connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def explain_count(queryset: QuerySet) -> int:
+    """Оценка числа строк запроса по плану PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def filtered_count(queryset: QuerySet) -> int:
+    """Число строк отфильтрованного запроса.
+
+    Небольшие результаты считаются точно запросом с LIMIT и не
+    кэшируются: после добавления в избранное count и следующая страница
+    должны сразу стать видны. Для больших берется оценка из плана
+    запроса, она кэшируется по SQL запроса с параметрами, то есть по
+    нормализованному набору фильтров.
+    """
+    queryset = queryset.order_by()
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f'{sql}:{params}'.encode()).hexdigest()
+    key = COUNT_CACHE_KEY.format(digest=digest)
+    count = cache.get(key)
+    if count is not None:
+        return count
+    threshold = settings.EXACT_COUNT_THRESHOLD
+    count = queryset[: threshold + 1].count()
+    if count > threshold:
+        count = max(explain_count(queryset), count)
+        cache.set(key, count, timeout=settings.COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class EstimatedPage(Page):
+    """Страница, для которой наличие следующей известно без count."""
+
+    def __init__(
+        self,
+        object_list: list,
+        number: int,
+        paginator: Paginator,
+        has_next: bool,
+    ) -> None:
+        """Страница number со строками object_list."""
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор с приблизительным числом строк для больших выборок.
+
+    Без фильтров число берется из статистики таблицы, для больших
+    выборок с фильтрами - из кэша с коротким TTL. Небольшие выборки
+    считаются точно. Оценка идет только в поле count: номер страницы
+    с оценкой не сверяется, а следующая страница определяется по
+    лишней строке, запрошенной вместе с текущей. Поэтому при
+    заниженной оценке дальние страницы остаются доступными, а при
+    завышенной не появляются пустые.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        estimate = estimate_count(self.object_list)
+        if estimate is None:
+            return filtered_count(self.object_list)
+        if estimate < settings.EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+    def validate_number(self, number: object) -> int:
+        """Проверяет только формат номера, без сравнения с count."""
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number: object) -> EstimatedPage:
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return EstimatedPage(
+            rows[: self.per_page],
+            number,
+            self,
+            has_next=len(rows) > self.per_page,
+        )
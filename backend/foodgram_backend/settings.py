@@ -1,4 +1,5 @@
 import os
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,9 +24,11 @@ INSTALLED_APPS = [
     'djoser',
     'api',
     'recipes.apps.RecipesConfig',
+    'jobs.apps.JobsConfig',
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -33,6 +36,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.cache_purge.CacheTagsMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -91,6 +95,21 @@ USE_L10N = True
 
 USE_TZ = True
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    },
+}
+
+# LocMemCache живет в памяти процесса: сброс записи в одном воркере
+# gunicorn не виден остальным, поэтому кэши, которые сбрасываются
+# сигналами, с ним общий кэш не используют.
+CACHE_IS_SHARED = not CACHES['default']['BACKEND'].endswith('LocMemCache')
+
 STATIC_URL = '/static/'
 
 STATIC_ROOT = BASE_DIR.joinpath('static')
@@ -103,17 +122,80 @@ FIELD_MAX_LENGTH = 200
 FIELD_LOW_LENGTH = 20
 MIN_INTEGER_VALUE = 0
 MAX_INTEGER_VALUE = 32000
+MATCH_DEFAULT_LIMIT = 10
+MATCH_MAX_LIMIT = 100
+MATCH_MAX_INGREDIENTS = 500
+SHOPPING_LIST_MAX_SERVINGS = 100
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+BULK_MAX_IDS = 200
+POPULARITY_EPOCH = datetime(2023, 1, 1, tzinfo=timezone.utc)
+POPULARITY_HALF_LIFE = timedelta(days=7)
+SIMILAR_RECIPES_COUNT = 10
+SIMILAR_BLOCK_SIZE = 2000
+SIMILAR_MAX_DF = 1000
+SIMILAR_CANDIDATES = 100
+SIMILAR_DF_CACHE_TIMEOUT = 60 * 60
+SIMILAR_TAG_WEIGHT = 0.5
+TOKEN_CACHE_TIMEOUT = 5 * 60
+TOKEN_LOCAL_CACHE_TIMEOUT = 5
+TOKEN_LOCAL_CACHE_SIZE = 10000
+AUTHOR_CARD_CACHE_TIMEOUT = 60 * 60
+AUTHOR_CARD_LOCAL_CACHE_TIMEOUT = 5
+AUTHOR_CARD_LOCAL_CACHE_SIZE = 10000
+EXACT_COUNT_THRESHOLD = 10000
+COUNT_CACHE_TIMEOUT = 30
+DELETE_CHUNK_SIZE = 500
+CACHE_PURGE_URL = os.getenv('CACHE_PURGE_URL', '')
+CACHE_PURGE_HOST = os.getenv('CACHE_PURGE_HOST', ALLOWED_HOSTS[0])
+CACHE_PURGE_SECRET = os.getenv('CACHE_PURGE_SECRET', '')
+CACHE_PURGE_TIMEOUT = 2
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_MODE = os.getenv('PROFILING_MODE', 'sampling')
+PROFILING_INTERVAL = 0.005
+PROFILING_DIR = Path(
+    os.getenv('PROFILING_DIR', BASE_DIR.joinpath('profiles')),
+)
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', 200))
+MAX_PAGE_SIZE = 100
+RECIPES_LIMIT_MAX = 50
+THROTTLE_LOCAL_CACHE_SIZE = 10000
+CONCURRENCY_LIMITS = {
+    'shopping_list': 4,
+    'subscriptions': 8,
+    'uploads': 4,
+}
+CONCURRENCY_SLOT_TIMEOUT = 60
+CONCURRENCY_RETRY_AFTER = 1
+JOBS_WORKER_THREADS = 4
+JOBS_POLL_INTERVAL = 5
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.AnonBucketThrottle',
+        'api.throttling.UserBucketThrottle',
+        'api.throttling.ScopedBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '120/min',
+        'user': '600/min',
+        'shopping_list': '30/min',
+        'subscriptions': '120/min',
+        'uploads': '30/min',
+    },
+    # Перед бэкендом стоит nginx, IP клиента берется из X-Forwarded-For.
+    'NUM_PROXIES': 1,
 }
 
 DJOSER = {
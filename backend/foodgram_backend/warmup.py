@@ -0,0 +1,23 @@
+from django.urls import get_resolver
+
+from api import serializers
+
+
+def warm_up() -> None:
+    """Прогрев приложения в мастер-процессе gunicorn перед fork.
+
+    Заполняет кэши URL-резолвера и метаданных моделей и строит поля
+    сериализаторов: это состояние процесса, воркеры получают его после
+    fork готовым. Данные из базы не читаются, справочники вьюсеты все
+    равно запрашивают заново, а соединение мастера воркерам не нужно.
+    """
+    get_resolver().reverse_dict
+    for serializer_class in (
+        serializers.CreateRecipeSerializer,
+        serializers.ShortRecipeSerializer,
+        serializers.SubscriptionSerializer,
+        serializers.CustomUserSerializer,
+        serializers.TagSerializer,
+        serializers.IngredientSerializer,
+    ):
+        serializer_class().fields
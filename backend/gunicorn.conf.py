@@ -0,0 +1,35 @@
+import os
+import time
+
+bind = os.getenv('GUNICORN_BIND', '0:8000')
+# В контейнере cpu_count() возвращает число CPU хоста, а не доступных
+# процессу, поэтому берется маска affinity и число воркеров ограничено.
+_max_workers = int(os.getenv('GUNICORN_MAX_WORKERS', 8))
+workers = int(
+    os.getenv(
+        'GUNICORN_WORKERS',
+        min(len(os.sched_getaffinity(0)) * 2 + 1, _max_workers),
+    ),
+)
+threads = int(os.getenv('GUNICORN_THREADS', 2))
+preload_app = True
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+_started_at = time.monotonic()
+
+
+def when_ready(server: object) -> None:
+    from foodgram_backend.warmup import warm_up
+
+    warm_up_started_at = time.monotonic()
+    try:
+        warm_up()
+    except Exception:
+        server.log.exception('Warm-up failed, workers will start cold')
+    now = time.monotonic()
+    server.log.info(
+        'Warm-up finished in %.2fs, master ready in %.2fs',
+        now - warm_up_started_at,
+        now - _started_at,
+    )
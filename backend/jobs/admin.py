@@ -0,0 +1,30 @@
+from django.contrib import admin
+from django.db.models import QuerySet
+from django.http import HttpRequest
+from django.utils import timezone
+
+from jobs.models import Job
+from recipes.admin import BaseAdmin
+
+
+@admin.register(Job)
+class JobAdmin(BaseAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'created_at',
+    )
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error',)
+    actions = ('retry',)
+
+    @admin.action(description='Перезапустить выбранные задачи')
+    def retry(self, request: HttpRequest, queryset: QuerySet) -> None:
+        queryset.update(
+            status=Job.PENDING,
+            attempts=0,
+            run_at=timezone.now(),
+        )
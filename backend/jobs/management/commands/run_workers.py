@@ -0,0 +1,73 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs.queue import run_next_job, work
+
+
+def run_threads(threads: int, stop: threading.Event) -> None:
+    workers = [
+        threading.Thread(target=work, args=(stop,), daemon=True)
+        for _ in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        # join с таймаутом, чтобы главный поток получал сигналы.
+        while worker.is_alive():
+            worker.join(1)
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры очереди фоновых задач.'
+
+    def add_arguments(self, parser: object) -> None:
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.JOBS_WORKER_THREADS,
+            help='Сколько потоков-воркеров в каждом процессе.',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Сколько процессов запустить, для задач, нагружающих CPU.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+
+    def handle(self, *args: tuple, **options: dict) -> None:
+        if options['once']:
+            processed = 0
+            while run_next_job():
+                processed += 1
+            self.stdout.write(f'Выполнено задач: {processed}.')
+            return
+        stop = multiprocessing.Event()
+        # Текущая задача доделывается, новые не берутся.
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *args: stop.set())
+        if options['processes'] == 1:
+            run_threads(options['threads'], stop)
+            return
+        # Соединения с базой нельзя делить между процессами.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=run_threads,
+                args=(options['threads'], stop),
+            )
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
@@ -0,0 +1,59 @@
+from django.db import models
+from django.utils import timezone
+
+from foodgram_backend.models import DefaultModel
+
+
+class Job(DefaultModel):
+    """Отложенная задача в очереди на PostgreSQL.
+
+    Создается в той же транзакции, что и изменения, которые ее
+    породили, и выполняется воркерами run_workers. Успешно выполненные
+    задачи удаляются, исчерпавшие попытки остаются со статусом failed.
+    """
+
+    PENDING = 'pending'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'в очереди'),
+        (FAILED, 'ошибка'),
+    )
+
+    name = models.CharField(max_length=255, verbose_name='задача')
+    args = models.JSONField(default=list, verbose_name='аргументы')
+    kwargs = models.JSONField(
+        default=dict,
+        verbose_name='именованные аргументы',
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+        verbose_name='статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='попыток',
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='выполнить не раньше',
+    )
+    last_error = models.TextField(blank=True, verbose_name='последняя ошибка')
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='дата создания',
+    )
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=['run_at'],
+                condition=models.Q(status='pending'),
+                name='job_pending_run_at_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,125 @@
+import logging
+import random
+import select
+import threading
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'jobs'
+
+# Имя задачи -> функция, заполняется декоратором task.
+TASKS = {}
+
+
+def task(func: callable) -> callable:
+    """Регистрирует функцию как задачу очереди.
+
+    Аргументы задачи хранятся в JSON, поэтому передавать нужно id и
+    строки, а не объекты моделей.
+    """
+    func.task_name = f'{func.__module__}.{func.__name__}'
+    TASKS[func.task_name] = func
+    return func
+
+
+def enqueue(func: callable, *args: tuple, **kwargs: dict) -> Job:
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Воркеры увидят задачу только после коммита, при откате она
+    исчезнет вместе с остальными изменениями. NOTIFY в PostgreSQL
+    тоже доставляется только после коммита.
+    """
+    job = Job.objects.create(name=func.task_name, args=args, kwargs=kwargs)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_notify(%s, %s)',
+            [NOTIFY_CHANNEL, job.name],
+        )
+    return job
+
+
+def get_task(name: str) -> callable:
+    """Функция задачи по имени, модуль задачи импортируется при надобности."""
+    if name not in TASKS:
+        import_module(name.rpartition('.')[0])
+    return TASKS[name]
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Экспоненциальная задержка с разбросом, чтобы повторы не совпадали."""
+    delay = min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_MAX_DELAY,
+    )
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def run_next_job() -> bool:
+    """Выполняет одну готовую задачу, возвращает False, если их нет.
+
+    Задача захватывается SELECT ... FOR UPDATE SKIP LOCKED и
+    выполняется в той же транзакции: параллельные воркеры ее пропускают,
+    а при падении воркера блокировка снимается и задача выполнится
+    снова. Ошибка задачи откатывает только ее savepoint.
+    """
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.PENDING, run_at__lte=timezone.now())
+            .order_by('run_at')
+            .first()
+        )
+        if job is None:
+            return False
+        try:
+            with transaction.atomic():
+                get_task(job.name)(*job.args, **job.kwargs)
+        except Exception:
+            job.attempts += 1
+            job.last_error = traceback.format_exc()
+            if job.attempts >= settings.JOBS_MAX_ATTEMPTS:
+                job.status = Job.FAILED
+                logger.exception('Задача %s не выполнена', job)
+            else:
+                job.run_at = timezone.now() + retry_delay(job.attempts)
+                logger.warning('Задача %s будет повторена', job)
+            job.save(
+                update_fields=['attempts', 'last_error', 'status', 'run_at'],
+            )
+        else:
+            job.delete()
+    return True
+
+
+def wait_for_jobs(timeout: float) -> None:
+    """Ждет NOTIFY о новой задаче, но не дольше timeout секунд."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+    raw = connection.connection
+    if select.select([raw], [], [], timeout)[0]:
+        raw.poll()
+        raw.notifies.clear()
+
+
+def work(stop: threading.Event) -> None:
+    """Цикл воркера: выполняет задачи подряд, без задач ждет NOTIFY."""
+    try:
+        while not stop.is_set():
+            try:
+                if not run_next_job():
+                    wait_for_jobs(settings.JOBS_POLL_INTERVAL)
+            except DatabaseError:
+                logger.exception('Ошибка базы данных в воркере')
+                connection.close()
+                stop.wait(settings.JOBS_POLL_INTERVAL)
+    finally:
+        connection.close()
@@ -1,33 +1,181 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+from django.db.models import Count, Field, QuerySet
+from django.forms import BaseInlineFormSet, Form
+from django.http import HttpRequest
 
-from recipes.models import (
-    Favourite,
-    Ingredient,
-    Recipe,
-    RecipeIngredient,
-    RecipeTag,
-    Tag,
-)
+from foodgram_backend.pagination import EstimatedCountPaginator
+from recipes.deletion import delete_recipes, delete_user
+from recipes.models import Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag
 
 User = get_user_model()
 
 
 class BaseAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
-
-
-class RecipeTagAdminInline(admin.TabularInline):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ChunkedDeleteAdminMixin:
+    """Удаление без обхода всех связанных объектов в Python.
+
+    Страница подтверждения не перечисляет каскадно удаляемые объекты,
+    но право на их удаление проверяется так же, как в Django: по
+    моделям, зарегистрированным в админке, у которых есть строки,
+    связанные с удаляемыми объектами.
+    """
+
+    delete_select_related = ()
+
+    def get_deleted_objects(
+        self,
+        objs: QuerySet,
+        request: HttpRequest,
+    ) -> tuple:
+        if isinstance(objs, QuerySet):
+            objs = objs.select_related(*self.delete_select_related)
+        objs = list(objs)
+        queryset = self.model._base_manager.filter(
+            pk__in=[obj.pk for obj in objs],
+        )
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            self.get_perms_needed(request, queryset, (self.model,)),
+            [],
+        )
+
+    def get_perms_needed(
+        self,
+        request: HttpRequest,
+        queryset: QuerySet,
+        path: tuple,
+    ) -> set:
+        """Модели, которые удалятся каскадом, но удалять их нельзя."""
+        perms_needed = set()
+        for relation in queryset.model._meta.related_objects:
+            model = relation.related_model
+            if model in path:
+                continue
+            related = model._base_manager.filter(
+                **{f'{relation.field.name}__in': queryset},
+            )
+            model_admin = self.admin_site._registry.get(model)
+            if (
+                model_admin is not None
+                and not model_admin.has_delete_permission(request)
+                and related.exists()
+            ):
+                perms_needed.add(model._meta.verbose_name)
+            perms_needed |= self.get_perms_needed(
+                request,
+                related,
+                path + (model,),
+            )
+        return perms_needed
+
+    def delete_model(self, request: HttpRequest, obj: object) -> None:
+        self.delete_queryset(
+            request,
+            self.model.objects.filter(pk=obj.pk),
+        )
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Autocomplete, которому выбранный объект передается готовым.
+
+    Стандартный виджет читает подпись выбранного значения отдельным
+    запросом, в инлайне это запрос на каждую строку. Если в selected
+    лежит объект с тем же pk, что и значение поля, подпись берется из
+    него, иначе виджет работает как обычно.
+    """
+
+    selected = None
+
+    def optgroups(self, name: str, value: list, attr: dict = None) -> list:
+        if self.selected is None or value != [str(self.selected.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(
+            self.create_option(
+                name,
+                self.selected.pk,
+                self.choices.field.label_from_instance(self.selected),
+                True,
+                len(options),
+            ),
+        )
+        return [(None, options, 0)]
+
+
+class PreloadedAutocompleteFormSet(BaseInlineFormSet):
+    """Передает виджетам autocomplete связанные объекты строк."""
+
+    def add_fields(self, form: Form, index: int) -> None:
+        super().add_fields(form, index)
+        if form.instance.pk is None:
+            return
+        for name, field in form.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, PreloadedAutocompleteSelect):
+                widget.selected = getattr(form.instance, name)
+
+
+class PreloadedAutocompleteInline(admin.TabularInline):
+    """Инлайн, строки которого не читают подписи autocomplete из базы.
+
+    Связанные объекты должны загружаться в get_queryset через
+    select_related, тогда форма изменения делает постоянное число
+    запросов независимо от числа строк.
+    """
+
+    formset = PreloadedAutocompleteFormSet
+
+    def formfield_for_foreignkey(
+        self,
+        db_field: Field,
+        request: HttpRequest,
+        **kwargs: dict,
+    ) -> Field:
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field,
+                self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class RecipeTagAdminInline(PreloadedAutocompleteInline):
     model = RecipeTag
+    autocomplete_fields = ('tag',)
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        return super().get_queryset(request).select_related(
+            'tag',
+            'recipe__author',
+        )
 
 
-class RecipeIngredientInline(admin.TabularInline):
+class RecipeIngredientInline(PreloadedAutocompleteInline):
     model = RecipeIngredient
     min_num = 1
+    autocomplete_fields = ('ingredients',)
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        return super().get_queryset(request).select_related(
+            'ingredients',
+            'recipe__author',
+        )
 
 
 @admin.register(Recipe)
-class RecipesAdmin(BaseAdmin):
+class RecipesAdmin(ChunkedDeleteAdminMixin, BaseAdmin):
     list_display = (
         'pk',
         'author',
@@ -37,18 +185,36 @@ class RecipesAdmin(BaseAdmin):
         'text',
         'cooking_time',
     )
-    list_editable = ('text', 'name')
+    list_editable = ('name',)
+    list_select_related = ('author',)
+    delete_select_related = ('author',)
     search_fields = (
         'text',
         'name',
     )
+    autocomplete_fields = ('author',)
     inlines = (RecipeTagAdminInline, RecipeIngredientInline)
     list_filter = ('tags',)
 
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(favorited_count=Count('recipes', distinct=True))
+        )
+
     def favorited_count(self, obj: Recipe) -> int:
-        return Favourite.objects.filter(recipes=obj).count()
+        return obj.favorited_count
 
     favorited_count.short_description = 'Раз в избранном'
+    favorited_count.admin_order_field = 'favorited_count'
+
+    def delete_queryset(
+        self,
+        request: HttpRequest,
+        queryset: QuerySet,
+    ) -> None:
+        delete_recipes(queryset)
 
 
 @admin.register(Ingredient)
@@ -63,3 +229,18 @@ class IngredientsAdmin(BaseAdmin):
 @admin.register(Tag)
 class TagAdmin(BaseAdmin):
     list_display = ('name', 'color', 'slug')
+    search_fields = ('name', 'slug')
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class CustomUserAdmin(ChunkedDeleteAdminMixin, UserAdmin):
+    def delete_queryset(
+        self,
+        request: HttpRequest,
+        queryset: QuerySet,
+    ) -> None:
+        for user in queryset:
+            delete_user(user)
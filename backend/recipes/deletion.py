@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.dispatch import Signal
+
+from jobs.queue import enqueue, task
+from recipes.models import Recipe, User
+
+# Отправляется один раз на пачку удаленных рецептов вместо post_delete.
+recipes_deleted = Signal()
+
+
+@task
+def delete_image_files(names: list) -> None:
+    storage = Recipe._meta.get_field('image').storage
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+def delete_recipes(recipes: QuerySet) -> int:
+    """Удаляет рецепты пачками без загрузки связанных строк в память.
+
+    Связанные строки удаляются одним DELETE ... WHERE IN на пачку,
+    файлы изображений - задачей очереди после коммита транзакции.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                recipes.order_by().values_list('id', 'image')[
+                    : settings.DELETE_CHUNK_SIZE
+                ],
+            )
+            if not chunk:
+                return deleted
+            ids, images = zip(*chunk)
+            for relation in Recipe._meta.related_objects:
+                relation.related_model._base_manager.filter(
+                    **{f'{relation.field.name}__in': ids},
+                ).delete()
+            Recipe._base_manager.filter(id__in=ids)._raw_delete(recipes.db)
+            recipes_deleted.send(sender=Recipe, ids=ids)
+            enqueue(delete_image_files, images)
+        deleted += len(ids)
+
+
+def delete_user(user: User) -> None:
+    """Удаляет пользователя, предварительно удалив его рецепты пачками."""
+    delete_recipes(Recipe.objects.filter(author=user))
+    user.delete()
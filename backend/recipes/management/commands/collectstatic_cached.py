@@ -0,0 +1,33 @@
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+IGNORE_PATTERNS = ['CVS', '.*', '*~']
+MANIFEST_NAME = '.collectstatic-hash'
+
+
+class Command(BaseCommand):
+    help = 'Запускает collectstatic, только если исходные файлы изменились.'
+
+    def get_sources_hash(self) -> str:
+        files = []
+        for finder in finders.get_finders():
+            for path, storage in finder.list(IGNORE_PATTERNS):
+                stat = os.stat(storage.path(path))
+                files.append(f'{path}:{stat.st_size}:{stat.st_mtime_ns}')
+        return hashlib.sha256('\n'.join(sorted(files)).encode()).hexdigest()
+
+    def handle(self, *args: tuple, **options: dict) -> None:
+        manifest = Path(settings.STATIC_ROOT) / MANIFEST_NAME
+        sources_hash = self.get_sources_hash()
+        if manifest.exists() and manifest.read_text() == sources_hash:
+            self.stdout.write('Статика не изменилась, collectstatic пропущен.')
+            return
+        call_command('collectstatic', interactive=False, verbosity=0)
+        manifest.write_text(sources_hash)
+        self.stdout.write(self.style.SUCCESS('Статика собрана.'))
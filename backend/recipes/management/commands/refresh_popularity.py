@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from recipes.models import (
+    Favourite,
+    Recipe,
+    RecipePopularity,
+    ShoppingCart,
+    popularity_refreshed,
+)
+
+# Запас по времени для событий, закоммиченных уже после прошлого пересчета.
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+# Рейтинг trending считается с "прямым" затуханием: вес события
+# 2 ** ((created_at - POPULARITY_EPOCH) / POPULARITY_HALF_LIFE) не зависит
+# от момента пересчета, поэтому старые значения не нужно пересчитывать,
+# а порядок совпадает с обычным экспоненциальным затуханием.
+# События фильтруются в каждой таблице до UNION: CTE, на который ссылаются
+# дважды, PostgreSQL 12+ материализует целиком.
+REFRESH_SQL = '''
+{changed}
+INSERT INTO {popularity} (recipe_id, popular, trending, refreshed_at)
+SELECT
+    recipe_id,
+    COUNT(*),
+    SUM(POWER(
+        2.0,
+        EXTRACT(EPOCH FROM created_at - %(epoch)s)::float8 / %(half_life)s
+    )),
+    %(now)s
+FROM (
+    SELECT recipes_id AS recipe_id, created_at FROM {favourite} {where}
+    UNION ALL
+    SELECT recipes_id AS recipe_id, created_at FROM {shopping_cart} {where}
+) AS events
+GROUP BY recipe_id
+ON CONFLICT (recipe_id) DO UPDATE SET
+    popular = EXCLUDED.popular,
+    trending = EXCLUDED.trending,
+    refreshed_at = EXCLUDED.refreshed_at
+'''
+
+# Рецепты с новыми событиями - по индексам created_at, их события -
+# по индексам recipes_id.
+CHANGED_CTE = '''
+WITH changed AS (
+    SELECT recipes_id FROM {favourite} WHERE created_at >= %(since)s
+    UNION
+    SELECT recipes_id FROM {shopping_cart} WHERE created_at >= %(since)s
+)
+'''
+
+INCREMENTAL_WHERE = 'WHERE recipes_id IN (SELECT recipes_id FROM changed)'
+
+# Строки для рецептов без событий: сортировка по рейтингу соединяет
+# рецепты с таблицей рейтингов без LEFT JOIN.
+MISSING_SQL = '''
+INSERT INTO {popularity} (recipe_id, popular, trending, refreshed_at)
+SELECT id, 0, 0, %(now)s FROM {recipe}
+ON CONFLICT (recipe_id) DO NOTHING
+'''
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинги popular и trending для рецептов.'
+
+    def add_arguments(self, parser: object) -> None:
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help=(
+                'Пересчитать все рецепты. Без флага пересчитываются только '
+                'рецепты с новыми добавлениями; удаления из избранного и '
+                'корзины учитываются при полном пересчете.'
+            ),
+        )
+
+    def handle(self, *args: tuple, **options: dict) -> None:
+        now = timezone.now()
+        since = None
+        if not options['full']:
+            since = RecipePopularity.objects.aggregate(
+                last=Max('refreshed_at'),
+            )['last']
+        tables = {
+            'favourite': Favourite._meta.db_table,
+            'shopping_cart': ShoppingCart._meta.db_table,
+            'popularity': RecipePopularity._meta.db_table,
+            'recipe': Recipe._meta.db_table,
+        }
+        sql = REFRESH_SQL.format(
+            changed=CHANGED_CTE.format(**tables) if since else '',
+            where=INCREMENTAL_WHERE if since else '',
+            **tables,
+        )
+        params = {
+            'epoch': settings.POPULARITY_EPOCH,
+            'half_life': settings.POPULARITY_HALF_LIFE.total_seconds(),
+            'now': now,
+            'since': since and since - REFRESH_OVERLAP,
+        }
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            refreshed = cursor.rowcount
+            if since is None:
+                RecipePopularity.objects.filter(refreshed_at__lt=now).update(
+                    popular=0,
+                    trending=0,
+                    refreshed_at=now,
+                )
+                cursor.execute(MISSING_SQL.format(**tables), params)
+            popularity_refreshed.send(sender=RecipePopularity)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Пересчитано рейтингов: {refreshed} '
+                f'({"полный" if since is None else "инкрементальный"}).',
+            ),
+        )
@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import build_similar
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу похожих рецептов.'
+
+    def add_arguments(self, parser: object) -> None:
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=settings.SIMILAR_BLOCK_SIZE,
+            help='Сколько рецептов обрабатывать за один запрос.',
+        )
+
+    def handle(self, *args: tuple, **options: dict) -> None:
+        started = time.monotonic()
+        processed = build_similar(options['block_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Похожие рецепты пересчитаны для {processed} рецептов '
+                f'за {time.monotonic() - started:.1f} с.',
+            ),
+        )
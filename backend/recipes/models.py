@@ -2,6 +2,8 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.dispatch import Signal
+from django.utils import timezone
 
 from foodgram_backend.models import DefaultModel
 
@@ -78,9 +80,24 @@ class Recipe(DefaultModel):
         verbose_name='время приготовления',
         validators=(MinValueValidator(1), MaxValueValidator(32000)),
     )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='дата создания',
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='дата изменения',
+    )
 
     class Meta:
         ordering = ('-id',)
+        indexes = [
+            models.Index(
+                fields=['author', '-id'],
+                name='recipe_author_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'Рецепт {self.name} от {self.author}'
@@ -120,9 +137,15 @@ class RecipeIngredient(DefaultModel):
 
     class Meta:
         ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=['ingredients', 'recipe'],
+                name='ingredient_recipe_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
-        return f'{self.ingredient_id} для рецепта {self.recipe}'
+        return f'{self.ingredients_id} для рецепта {self.recipe}'
 
 
 class Follow(DefaultModel):
@@ -165,6 +188,11 @@ class Favourite(DefaultModel):
         related_name='recipes',
         verbose_name='рецепт',
     )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='дата добавления',
+    )
 
     class Meta:
         constraints = [
@@ -189,6 +217,11 @@ class ShoppingCart(DefaultModel):
         related_name='shopping_cart_recipes',
         verbose_name='рецепт',
     )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        db_index=True,
+        verbose_name='дата добавления',
+    )
 
     class Meta:
         constraints = [
@@ -198,3 +231,85 @@ class ShoppingCart(DefaultModel):
             ),
         ]
         ordering = ('id',)
+
+
+class RecipePopularity(DefaultModel):
+    """Предрасчитанный рейтинг рецепта.
+
+    Обновляется командой refresh_popularity по таблицам избранного
+    и корзины.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='popularity',
+        verbose_name='рецепт',
+    )
+    popular = models.PositiveIntegerField(
+        default=0,
+        verbose_name='добавлений в избранное и корзину',
+    )
+    trending = models.FloatField(
+        default=0,
+        verbose_name='рейтинг с затуханием по времени',
+    )
+    refreshed_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='дата пересчета',
+    )
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=['-popular', '-recipe'],
+                name='popularity_popular_idx',
+            ),
+            models.Index(
+                fields=['-trending', '-recipe'],
+                name='popularity_trending_idx',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'Рейтинг {self.recipe_id}: {self.popular}/{self.trending}'
+
+
+# Отправляется командой refresh_popularity после пересчета рейтингов.
+popularity_refreshed = Signal()
+
+
+class SimilarRecipe(DefaultModel):
+    """Предрасчитанный похожий рецепт.
+
+    Хранит до SIMILAR_RECIPES_COUNT соседей на рецепт по косинусной
+    близости TF-IDF векторов ингредиентов и тегов. Строится командой
+    refresh_similar и обновляется при изменении состава рецепта.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='похожий рецепт',
+    )
+    score = models.FloatField(verbose_name='близость')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe',
+            ),
+        ]
+        ordering = ('id',)
+
+    def __str__(self) -> str:
+        return f'{self.similar_id} похож на {self.recipe_id}: {self.score}'
@@ -0,0 +1,307 @@
+import heapq
+import math
+from array import array
+from collections import Counter, defaultdict
+from operator import itemgetter
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from jobs.queue import task
+from recipes.models import Recipe, RecipeIngredient, RecipeTag, SimilarRecipe
+
+DOCUMENT_FREQUENCIES_KEY = 'similar_document_frequencies'
+
+
+def load_features(recipe_ids: Optional[Iterable] = None) -> dict:
+    """Разреженные векторы рецептов: id рецепта -> кортеж признаков.
+
+    Признаки - id ингредиентов и id тегов со знаком минус, tf бинарный.
+    """
+    lines = RecipeIngredient.objects.values_list('recipe_id', 'ingredients_id')
+    tags = RecipeTag.objects.values_list('recipe_id', 'tag_id')
+    if recipe_ids is not None:
+        lines = lines.filter(recipe_id__in=recipe_ids)
+        tags = tags.filter(recipe_id__in=recipe_ids)
+    features = defaultdict(set)
+    for recipe_id, ingredient_id in lines.order_by().iterator():
+        features[recipe_id].add(ingredient_id)
+    for recipe_id, tag_id in tags.order_by().iterator():
+        features[recipe_id].add(-tag_id)
+    return {
+        recipe_id: tuple(recipe_features)
+        for recipe_id, recipe_features in features.items()
+    }
+
+
+def count_frequencies(features: dict) -> Counter:
+    return Counter(
+        feature
+        for recipe_features in features.values()
+        for feature in recipe_features
+    )
+
+
+def get_frequencies() -> Counter:
+    """Число рецептов с каждым признаком, закэшированное на время.
+
+    Для инкрементального обновления немного устаревшие частоты
+    допустимы: они чуть сдвигают веса, но не состав признаков.
+    """
+    frequencies = cache.get(DOCUMENT_FREQUENCIES_KEY)
+    if frequencies is not None:
+        return frequencies
+    frequencies = Counter()
+    for ingredient_id, df in (
+        RecipeIngredient.objects.order_by()
+        .values_list('ingredients_id')
+        .annotate(df=Count('recipe_id', distinct=True))
+    ):
+        frequencies[ingredient_id] = df
+    for tag_id, df in (
+        RecipeTag.objects.order_by()
+        .values_list('tag_id')
+        .annotate(df=Count('recipe_id', distinct=True))
+    ):
+        frequencies[-tag_id] = df
+    cache.set(
+        DOCUMENT_FREQUENCIES_KEY,
+        frequencies,
+        timeout=settings.SIMILAR_DF_CACHE_TIMEOUT,
+    )
+    return frequencies
+
+
+class SimilarityIndex:
+    """TF-IDF векторы рецептов с инвертированным индексом.
+
+    Вес признака - сглаженный idf, у тегов он умножается на
+    SIMILAR_TAG_WEIGHT. Кандидаты в соседи ищутся только по редким
+    признакам (встречаются не более чем в SIMILAR_MAX_DF рецептах), иначе
+    соль и сахар дают квадрат пар. SIMILAR_CANDIDATES лучших кандидатов
+    по частичному скалярному произведению пересчитываются по всем
+    признакам, из них остается SIMILAR_RECIPES_COUNT соседей.
+    """
+
+    def __init__(
+        self,
+        features: dict,
+        frequencies: Counter,
+        total: int,
+    ) -> None:
+        """Индекс по признакам features при total рецептах в базе."""
+        self.features = features
+        # Квадраты весов: в скалярное произведение бинарных векторов
+        # общий признак входит как weight * weight.
+        self.weights = {}
+        for recipe_features in features.values():
+            for feature in recipe_features:
+                if feature not in self.weights:
+                    boost = settings.SIMILAR_TAG_WEIGHT if feature < 0 else 1
+                    weight = boost * (
+                        math.log((1 + total) / (1 + frequencies[feature])) + 1
+                    )
+                    self.weights[feature] = weight * weight
+        self.norms = {}
+        # Редкий признак -> (id рецептов, 1 / норма каждого рецепта).
+        self.postings = defaultdict(lambda: (array('q'), array('d')))
+        for recipe_id, recipe_features in features.items():
+            norm = math.sqrt(
+                sum(self.weights[feature] for feature in recipe_features),
+            )
+            self.norms[recipe_id] = norm
+            for feature in recipe_features:
+                if frequencies[feature] <= settings.SIMILAR_MAX_DF:
+                    recipe_ids, inverse_norms = self.postings[feature]
+                    recipe_ids.append(recipe_id)
+                    inverse_norms.append(1 / norm)
+
+    def similarity(self, recipe_id: int, other: int) -> float:
+        """Косинусная близость двух рецептов по всем признакам."""
+        if not self.features.get(recipe_id) or not self.features.get(other):
+            return 0
+        return sum(
+            self.weights[feature]
+            for feature in set(self.features[recipe_id]).intersection(
+                self.features[other],
+            )
+        ) / (self.norms[recipe_id] * self.norms[other])
+
+    def neighbours(self, recipe_id: int) -> list:
+        """Пары (близость, id рецепта), самые похожие первыми."""
+        own = self.features.get(recipe_id)
+        if not own:
+            return []
+        # Частичная близость по редким признакам, уже деленная на норму
+        # кандидата: для отбора норма самого рецепта не нужна.
+        partial = defaultdict(float)
+        for feature in own:
+            if feature in self.postings:
+                weight = self.weights[feature]
+                for other, inverse_norm in zip(*self.postings[feature]):
+                    partial[other] += weight * inverse_norm
+        partial.pop(recipe_id, None)
+        candidates = sorted(
+            partial.items(),
+            key=itemgetter(1),
+            reverse=True,
+        )[: settings.SIMILAR_CANDIDATES]
+        norms = self.norms
+        own = set(own)
+        return heapq.nlargest(
+            settings.SIMILAR_RECIPES_COUNT,
+            (
+                (
+                    sum(
+                        self.weights[feature]
+                        for feature in own.intersection(self.features[other])
+                    )
+                    / (norms[recipe_id] * norms[other]),
+                    other,
+                )
+                for other, _ in candidates
+            ),
+        )
+
+
+def build_similar(block_size: int) -> int:
+    """Полностью пересчитывает таблицу похожих рецептов.
+
+    Векторы всех рецептов загружаются один раз, соседи считаются и
+    записываются блоками по block_size рецептов, каждый блок в своей
+    транзакции: кроме индекса в памяти только результаты блока.
+    Возвращает число обработанных рецептов.
+    """
+    features = load_features()
+    frequencies = count_frequencies(features)
+    cache.set(
+        DOCUMENT_FREQUENCIES_KEY,
+        frequencies,
+        timeout=settings.SIMILAR_DF_CACHE_TIMEOUT,
+    )
+    index = SimilarityIndex(features, frequencies, Recipe.objects.count())
+    recipe_ids = sorted(features)
+    for start in range(0, len(recipe_ids), block_size):
+        block = recipe_ids[start: start + block_size]
+        rows = [
+            SimilarRecipe(recipe_id=recipe_id, similar_id=other, score=score)
+            for recipe_id in block
+            for score, other in index.neighbours(recipe_id)
+        ]
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(recipe_id__in=block).delete()
+            SimilarRecipe.objects.bulk_create(rows, batch_size=block_size)
+    SimilarRecipe.objects.exclude(recipe_id__in=recipe_ids).delete()
+    return len(recipe_ids)
+
+
+def refresh_neighbours(recipe_ids: set) -> set:
+    """Строит соседей рецептов заново и правит чужие списки.
+
+    Загружаются сами рецепты, рецепты с общими редкими признаками и
+    рецепты, в списках которых они уже есть. В чужих списках строки с
+    этими рецептами пересчитываются по новому составу, новые кандидаты
+    добавляются, и список заново обрезается до SIMILAR_RECIPES_COUNT
+    лучших. Возвращает рецепты, чьи списки сократились из-за соседей
+    без общих признаков.
+    """
+    frequencies = get_frequencies()
+    own = load_features(recipe_ids)
+    rare = {
+        feature
+        for recipe_features in own.values()
+        for feature in recipe_features
+        if frequencies[feature] <= settings.SIMILAR_MAX_DF
+    }
+    related = set(
+        RecipeIngredient.objects.filter(
+            ingredients_id__in=[feature for feature in rare if feature > 0],
+        ).values_list('recipe_id', flat=True),
+    ).union(
+        RecipeTag.objects.filter(
+            tag_id__in=[-feature for feature in rare if feature < 0],
+        ).values_list('recipe_id', flat=True),
+    )
+    incoming = set(
+        SimilarRecipe.objects.filter(similar_id__in=recipe_ids).values_list(
+            'recipe_id',
+            flat=True,
+        ),
+    )
+    index = SimilarityIndex(
+        {**load_features((related | incoming) - recipe_ids), **own},
+        frequencies,
+        Recipe.objects.count(),
+    )
+    SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+    created = []
+    added = defaultdict(dict)
+    for recipe_id in recipe_ids:
+        for score, other in index.neighbours(recipe_id):
+            created.append(
+                SimilarRecipe(
+                    recipe_id=recipe_id,
+                    similar_id=other,
+                    score=score,
+                ),
+            )
+            if other not in recipe_ids:
+                added[other][recipe_id] = score
+    current = defaultdict(list)
+    for row in SimilarRecipe.objects.filter(
+        recipe_id__in=incoming.union(added) - recipe_ids,
+    ):
+        current[row.recipe_id].append(row)
+    stale = set()
+    changed = []
+    shrunk = set()
+    for other, rows in current.items():
+        candidates = []
+        for row in rows:
+            if row.similar_id in recipe_ids:
+                row.score = index.similarity(other, row.similar_id)
+                changed.append(row)
+            candidates.append((row.score, row.similar_id, row))
+        listed = {row.similar_id for row in rows}
+        candidates.extend(
+            (score, similar, None)
+            for similar, score in added[other].items()
+            if similar not in listed
+        )
+        top = heapq.nlargest(
+            settings.SIMILAR_RECIPES_COUNT,
+            (candidate for candidate in candidates if candidate[0] > 0),
+            key=itemgetter(0, 1),
+        )
+        if len(top) < len(rows):
+            shrunk.add(other)
+        kept = {id(row) for _, _, row in top if row is not None}
+        stale.update(row.pk for row in rows if id(row) not in kept)
+        created.extend(
+            SimilarRecipe(recipe_id=other, similar_id=similar, score=score)
+            for score, similar, row in top
+            if row is None
+        )
+    SimilarRecipe.objects.filter(pk__in=stale).delete()
+    SimilarRecipe.objects.bulk_update(
+        [row for row in changed if row.pk not in stale],
+        ['score'],
+    )
+    SimilarRecipe.objects.bulk_create(created)
+    return shrunk
+
+
+@task
+@transaction.atomic
+def update_similar(recipe_ids: Iterable) -> None:
+    """Пересчитывает соседей рецептов после изменения их состава.
+
+    Рецепты, потерявшие соседей, перестраиваются вторым проходом: их
+    состав не менялся, поэтому чужие списки он уже не сокращает.
+    """
+    shrunk = refresh_neighbours(set(recipe_ids))
+    if shrunk:
+        refresh_neighbours(shrunk)
@@ -0,0 +1,169 @@
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    RecipeTag,
+    Tag,
+    User,
+)
+
+# Сессия, пользователь, тэги для фильтра, reltuples, count и рецепты.
+CHANGELIST_QUERIES = 6
+# Сессия, пользователь, savepoint транзакции формы, рецепт, строки
+# тэгов и ингредиентов со связанными объектами, автор рецепта, снятие
+# savepoint и автор в autocomplete.
+CHANGE_FORM_QUERIES = 9
+
+
+class RecipeAdminQueriesTest(TestCase):
+    """Число запросов страниц рецептов в админке не растет с данными."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@foodgram.ru',
+            password='password',
+        )
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'Тэг {number}', color='#fff', slug=f'tag{number}')
+            for number in range(5)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(30)
+        )
+
+    def setUp(self) -> None:
+        self.client.force_login(self.admin)
+        # Первый запрос заполняет кэш ContentType.
+        self.client.get(
+            f'/admin/recipes/recipe/{self.create_recipe(1).id}/change/',
+        )
+
+    def create_recipe(self, lines: int) -> Recipe:
+        recipe = Recipe.objects.create(
+            author=self.admin,
+            name='Рецепт',
+            image='recipes/images/recipe.png',
+            text='Описание',
+            cooking_time=5,
+        )
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag) for tag in self.tags[:lines]
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredients=ingredient, amount=1)
+            for ingredient in self.ingredients[:lines]
+        )
+        return recipe
+
+    def test_changelist(self) -> None:
+        for recipes in (1, 30):
+            with self.subTest(recipes=recipes):
+                while Recipe.objects.count() < recipes:
+                    self.create_recipe(lines=1)
+                with self.assertNumQueries(CHANGELIST_QUERIES):
+                    response = self.client.get('/admin/recipes/recipe/')
+                self.assertEqual(response.status_code, 200)
+
+    def test_change_form(self) -> None:
+        for lines in (1, 30):
+            with self.subTest(lines=lines):
+                recipe = self.create_recipe(lines)
+                with self.assertNumQueries(CHANGE_FORM_QUERIES):
+                    response = self.client.get(
+                        f'/admin/recipes/recipe/{recipe.id}/change/',
+                    )
+                self.assertContains(
+                    response,
+                    f'<option value="{self.ingredients[0].id}" selected>'
+                    f'{self.ingredients[0]}</option>',
+                    html=True,
+                )
+
+
+class ChunkedDeleteAdminTest(TestCase):
+    """Подтверждение удаления проверяет права на каскадные объекты."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.staff = User.objects.create_user(
+            username='staff',
+            email='staff@foodgram.ru',
+            password='password',
+            is_staff=True,
+        )
+        cls.staff.user_permissions.set(
+            Permission.objects.filter(
+                codename__in=('view_user', 'delete_user'),
+            ),
+        )
+        cls.author = User.objects.create_user(
+            username='author',
+            email='author@foodgram.ru',
+            password='password',
+        )
+
+    def setUp(self) -> None:
+        self.client.force_login(self.staff)
+
+    def create_recipe(self) -> Recipe:
+        return Recipe.objects.create(
+            author=self.author,
+            name='Рецепт',
+            image='recipes/images/recipe.png',
+            text='Описание',
+            cooking_time=5,
+        )
+
+    def test_cascade_without_permission(self) -> None:
+        self.create_recipe()
+        url = f'/admin/auth/user/{self.author.id}/delete/'
+        response = self.client.get(url)
+        self.assertEqual(
+            response.context['perms_lacking'],
+            {Recipe._meta.verbose_name},
+        )
+        self.assertEqual(
+            self.client.post(url, {'post': 'yes'}).status_code,
+            403,
+        )
+        self.assertTrue(User.objects.filter(id=self.author.id).exists())
+
+    def test_without_cascaded_objects(self) -> None:
+        url = f'/admin/auth/user/{self.author.id}/delete/'
+        self.assertFalse(self.client.get(url).context['perms_lacking'])
+        self.client.post(url, {'post': 'yes'})
+        self.assertFalse(User.objects.filter(id=self.author.id).exists())
+
+    def test_confirmation_queries(self) -> None:
+        admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@foodgram.ru',
+            password='password',
+        )
+        self.client.force_login(admin)
+        queries = []
+        for recipes in (1, 10):
+            while Recipe.objects.count() < recipes:
+                self.create_recipe()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(
+                    '/admin/recipes/recipe/',
+                    {
+                        'action': 'delete_selected',
+                        '_selected_action': Recipe.objects.values_list(
+                            'id',
+                            flat=True,
+                        ),
+                    },
+                )
+            self.assertContains(response, f'от {self.author}', count=recipes)
+            queries.append(len(context))
+        self.assertEqual(queries[0], queries[1])
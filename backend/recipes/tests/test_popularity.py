@@ -0,0 +1,52 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes.models import Favourite, Recipe, RecipePopularity, User
+
+
+class RefreshPopularityTest(TestCase):
+    """Инкрементальный пересчет не теряет события между запусками."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(
+            username='user',
+            email='user@foodgram.ru',
+            password='password',
+        )
+        cls.recipe = cls.create_recipe()
+
+    @classmethod
+    def create_recipe(cls) -> Recipe:
+        return Recipe.objects.create(
+            author=cls.user,
+            name='Рецепт',
+            image='recipes/images/recipe.png',
+            text='Описание',
+            cooking_time=5,
+        )
+
+    def refresh(self, *args: str) -> None:
+        call_command('refresh_popularity', *args, stdout=StringIO())
+
+    def test_new_recipe_does_not_skip_events(self) -> None:
+        self.refresh('--full')
+        now = timezone.now()
+        RecipePopularity.objects.update(refreshed_at=now - timedelta(hours=1))
+        favourite = Favourite.objects.create(
+            owner=self.user,
+            recipes=self.recipe,
+        )
+        Favourite.objects.filter(pk=favourite.pk).update(
+            created_at=now - timedelta(minutes=30),
+        )
+        new_recipe = self.create_recipe()
+        self.refresh()
+        popular = dict(
+            RecipePopularity.objects.values_list('recipe_id', 'popular'),
+        )
+        self.assertEqual(popular, {self.recipe.id: 1, new_recipe.id: 0})
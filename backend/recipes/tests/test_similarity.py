@@ -0,0 +1,118 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    SimilarRecipe,
+    User,
+)
+from recipes.similarity import build_similar, update_similar
+
+# Состав рецептов: индексы ингредиентов.
+COMPOSITIONS = (
+    (0, 1, 2),
+    (0, 1, 2),
+    (0, 1, 3),
+    (0, 4, 5),
+    (6, 7),
+)
+
+
+class SimilarRecipesTest(TestCase):
+    """Ранжирование соседей и их обновление при изменении состава."""
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        cls.user = User.objects.create_user(
+            username='user',
+            email='user@foodgram.ru',
+            password='password',
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(8)
+        )
+        cls.recipes = []
+        for number, composition in enumerate(COMPOSITIONS):
+            recipe = Recipe.objects.create(
+                author=cls.user,
+                name=f'Рецепт {number}',
+                image='recipes/images/recipe.png',
+                text='Описание',
+                cooking_time=5,
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredients=cls.ingredients[index],
+                    amount=1,
+                )
+                for index in composition
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self) -> None:
+        cache.clear()
+        build_similar(block_size=2)
+
+    def neighbours(self, recipe: Recipe) -> list:
+        return list(
+            SimilarRecipe.objects.filter(recipe=recipe)
+            .order_by('-score', 'similar_id')
+            .values_list('similar_id', flat=True),
+        )
+
+    def all_neighbours(self) -> dict:
+        return {recipe.id: self.neighbours(recipe) for recipe in self.recipes}
+
+    def test_ranking(self) -> None:
+        first, same, close, far, unrelated = self.recipes
+        self.assertEqual(
+            self.neighbours(first),
+            [same.id, close.id, far.id],
+        )
+        self.assertEqual(self.neighbours(unrelated), [])
+
+    def test_endpoint(self) -> None:
+        first, same, close, far, _ = self.recipes
+        response = self.client.get(f'/api/recipes/{first.id}/similar/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            [recipe['id'] for recipe in data],
+            [same.id, close.id, far.id],
+        )
+        scores = [recipe['score'] for recipe in data]
+        self.assertAlmostEqual(scores[0], 1)
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(
+            self.client.get('/api/recipes/0/similar/').status_code,
+            404,
+        )
+
+    @override_settings(SIMILAR_RECIPES_COUNT=1)
+    def test_noop_update_keeps_other_lists(self) -> None:
+        build_similar(block_size=2)
+        before = self.all_neighbours()
+        for recipe in self.recipes:
+            update_similar([recipe.id])
+            self.assertEqual(self.all_neighbours(), before)
+
+    def test_update_matches_rebuild(self) -> None:
+        unrelated = self.recipes[-1]
+        RecipeIngredient.objects.filter(recipe=unrelated).delete()
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=unrelated,
+                ingredients=self.ingredients[index],
+                amount=1,
+            )
+            for index in (0, 1, 2)
+        )
+        update_similar([unrelated.id])
+        updated = self.all_neighbours()
+        self.assertIn(unrelated.id, updated[self.recipes[0].id])
+        build_similar(block_size=2)
+        self.assertEqual(updated, self.all_neighbours())
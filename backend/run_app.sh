@@ -1,5 +1,12 @@
 #!/bin/sh
 
-python manage.py migrate;
-python manage.py collectstatic --no-input;
-gunicorn -b 0:8000 foodgram_backend.wsgi;
\ No newline at end of file
+started_at=$(date +%s)
+
+python manage.py migrate --check > /dev/null 2>&1 || python manage.py migrate --no-input;
+migrated_at=$(date +%s)
+
+python manage.py collectstatic_cached;
+collected_at=$(date +%s)
+
+echo "Startup: migrate $((migrated_at - started_at))s, collectstatic $((collected_at - migrated_at))s";
+exec gunicorn -c gunicorn.conf.py foodgram_backend.wsgi;